@@ -1,551 +1,3090 @@
-import os
-import threading
-import subprocess
-import win32gui
-import win32con
-import shutil
-import zipfile
-import re
-import winreg
-import tkinter as tk
-import string
-from ctypes import windll
-from tkinter import ttk, filedialog, messagebox
-from urllib.request import urlopen
-from io import BytesIO
-
-# Windows registry access for Steam path detection
-try:
-    import winreg
-except ImportError:
-    winreg = None
-
-# Constants
-STEAMCMD_URL      = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
-STARBOUND_APP_ID  = "211820"
-WORKSHOP_MOD_IDS  = ["3534616750"]
-NIGHTLY_URL       = (
-    "https://nightly.link/OpenStarbound/OpenStarbound/"
-    "workflows/build/main/OpenStarbound-Windows-Client.zip"
-)
-
-def list_drives():
-    """Return a list of all mounted drive letters (e.g. ['C:\\','D:\\',…])."""
-    drives = []
-    mask = windll.kernel32.GetLogicalDrives()
-    for i, letter in enumerate(string.ascii_uppercase):
-        if mask & (1 << i):
-            drives.append(f"{letter}:\\")
-    return drives
-
-def get_steam_libraries():
-    """
-    Extract valid Steam library folders that are specifically named 'SteamLibrary'
-    and contain 'steamapps/common'.
-    """
-    found_paths = set()
-
-    def read_path(hive, flag):
-        try:
-            key = winreg.OpenKey(hive, r"Software\Valve\Steam", 0,
-                                winreg.KEY_READ | flag)
-            path, _ = winreg.QueryValueEx(key, "SteamPath")
-            return path
-        except OSError:
-            return None
-
-    roots = set()
-    for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
-        for view in (winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY):
-            path = read_path(hive, view)
-            if path:
-                roots.add(path)
-
-    roots.add(r"C:\Program Files (x86)\Steam")  # fallback
-
-    for root in roots:
-        vdf_path = os.path.join(root, "steamapps", "libraryfolders.vdf")
-        if not os.path.isfile(vdf_path):
-            continue
-
-        with open(vdf_path, encoding="utf-8") as f:
-            text = f.read()
-
-        paths = re.findall(r'"path"\s*"([^"]+)"', text)
-        for path in paths:
-            norm = os.path.normpath(path.replace("\\\\", "\\")).strip()
-            if os.path.isdir(norm):
-                # Only keep paths inside a folder named 'SteamLibrary'
-                if os.path.basename(norm).lower() == "steamlibrary":
-                    found_paths.add(norm)
-
-    print("→ Found Steam libraries named 'SteamLibrary':")
-    for path in found_paths:
-        print("   ", path)
-
-    return sorted(found_paths)
-
-def detect_starbound_install():
-    """
-    Return the path to the Starbound install if found (including starbound.exe),
-    otherwise return empty string.
-    """
-    paths = []
-
-    for lib in get_steam_libraries():
-        candidate = os.path.join(lib, "steamapps", "common", "Starbound")
-        exe_path = os.path.join(candidate, "starbound.exe")
-        if os.path.isfile(exe_path):
-            paths.append(candidate)
-
-    if paths:
-        print(f"→ Found Starbound installs: {paths}")
-        return paths[0]  # prioritize first one with exe present
-
-    # fallback scan for other drives
-    print("→ No SB in registered libraries, scanning all drives for SteamLibrary…")
-    for drive in list_drives():
-        candidate = os.path.join(drive, "SteamLibrary", "steamapps", "common", "Starbound")
-        exe_path = os.path.join(candidate, "starbound.exe")
-        if os.path.isfile(exe_path):
-            print("→ Found via fallback scan:", candidate)
-            return candidate
-
-    print("→ No existing Starbound install detected.")
-    return ""
-
-def bring_to_front(root):
-    """Bring the Tk window back on top."""
-    root.deiconify()
-    root.lift()
-    root.focus_force()
-
-class InstallerWizard(tk.Tk):
-    def __init__(self, libraries, existing_sb):
-        super().__init__()
-        self.title("Starbound + OpenStarbound Installer")
-        self.resizable(False, False)
-
-        # Store detection results
-        self.libraries        = libraries
-        self.steam_installed  = bool(existing_sb)
-        self.steam_dir        = tk.StringVar(value=existing_sb)
-        # Default install_dir for SteamCMD (first library + starbound path)
-        default_install = ""
-        if not self.steam_installed and libraries:
-            default_install = os.path.join(
-                libraries[0], "steamapps", "common", "Starbound"
-            )
-        self.install_dir      = tk.StringVar(value=default_install)
-        self.osb_dir          = tk.StringVar(
-            value=os.path.join(os.getcwd(), "OpenStarbound")
-        )
-        self.run_when_done    = tk.BooleanVar(value=True)
-
-        # Prepare wizard frames
-        self.frames = {}
-        for Frame in (StepPaths, StepInstall, StepFinish):
-            page = Frame(self)
-            self.frames[Frame] = page
-            page.grid(row=0, column=0, sticky="nsew")
-
-        self.show_frame(StepPaths)
-
-    def show_frame(self, frame_cls):
-        self.frames[frame_cls].tkraise()
-
-class StepPaths(tk.Frame):
-    def __init__(self, master):
-        super().__init__(master, padx=10, pady=10)
-        tk.Label(self,
-                text="Step 1: Locate or Install Starbound",
-                font=("Segoe UI", 12, "bold"))\
-        .grid(columnspan=3, pady=(0,10))
-
-        if master.steam_installed:
-            # Only show existing install path
-            tk.Label(self, text="Existing Starbound Install:")\
-            .grid(row=1, column=0, sticky="e")
-            tk.Entry(self, width=40, textvariable=master.steam_dir)\
-            .grid(row=1, column=1)
-            tk.Button(self, text="Browse…",
-                    command=lambda: self.browse(master.steam_dir))\
-            .grid(row=1, column=2)
-        else:
-            # Only show install location field
-            tk.Label(self, text="Install Starbound Here:")\
-            .grid(row=1, column=0, sticky="e")
-            tk.Entry(self, width=40, textvariable=master.install_dir)\
-            .grid(row=1, column=1)
-            tk.Button(self, text="Browse…",
-                    command=lambda: self.browse(master.install_dir))\
-            .grid(row=1, column=2)
-
-        # Always show OSB install path
-        tk.Label(self, text="OpenStarbound Install Dir:")\
-        .grid(row=2, column=0, sticky="e", pady=10)
-        tk.Entry(self, width=40, textvariable=master.osb_dir)\
-        .grid(row=2, column=1)
-        tk.Button(self, text="Browse…",
-                command=lambda: self.browse(master.osb_dir))\
-        .grid(row=2, column=2)
-
-        tk.Button(self, text="Next →", width=10,
-                command=self.validate)\
-        .grid(row=3, column=2, pady=15)
-
-    def browse(self, var):
-        path = filedialog.askdirectory()
-        if path:
-            var.set(path)
-
-    def validate(self):
-        m = self.master
-        # Validate required fields
-        if m.steam_installed:
-            if not m.steam_dir.get().strip():
-                return messagebox.showerror(
-                    "Error", "Please specify existing Starbound path."
-                )
-        else:
-            if not m.install_dir.get().strip():
-                return messagebox.showerror(
-                    "Error", "Please specify where to install Starbound."
-                )
-        if not m.osb_dir.get().strip():
-            return messagebox.showerror(
-                "Error", "Please specify OpenStarbound install directory."
-            )
-        m.show_frame(StepInstall)
-        m.frames[StepInstall].start_install()
-
-def minimize_steam_window():
-    def enum_windows_callback(hwnd, result):
-        if win32gui.IsWindowVisible(hwnd):
-            title = win32gui.GetWindowText(hwnd)
-            if "Steam" in title:
-                result.append(hwnd)
-    windows = []
-    win32gui.EnumWindows(enum_windows_callback, windows)
-    for hwnd in windows:
-        try:
-            win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-        except Exception as e:
-            print(f"Could not minimize window {hwnd}: {e}")
-
-
-class StepInstall(tk.Frame):
-    def __init__(self, master):
-        super().__init__(master, padx=10, pady=10)
-        tk.Label(self,
-                text="Step 2: Installing…",
-                font=("Segoe UI", 12, "bold"))\
-        .pack(anchor="w")
-
-        self.progress = ttk.Progressbar(self, length=500, mode="determinate")
-        self.progress.pack(pady=(5,10))
-
-        self.log = tk.Text(self, width=70, height=15,
-                        bg="#f9f9f9", state="disabled")
-        self.log.pack()
-
-        btn_frame = tk.Frame(self)
-        btn_frame.pack(fill="x", pady=10)
-        tk.Button(btn_frame, text="← Back",
-                command=lambda: master.show_frame(StepPaths))\
-        .pack(side="left")
-        self.next_btn = tk.Button(btn_frame, text="Next →",
-                                state="disabled",
-                                command=lambda: master.show_frame(StepFinish))
-        self.next_btn.pack(side="right")
-
-    def log_write(self, txt):
-        self.log.config(state="normal")
-        self.log.insert("end", txt + "\n")
-        self.log.see("end")
-        self.log.config(state="disabled")
-
-    def start_install(self):
-        threading.Thread(target=self._install, daemon=True).start()
-
-    def _install(self):
-        steps = [
-            ("Ensure Steam is running", self._step_steam),
-            ("Minimize Steam window", lambda: minimize_steam_window()),
-            ("Download SteamCMD",       self._step_steamcmd),
-            ("Install Starbound",       self._step_starbound),
-            ("Download and run OSB installer", self._step_installer_release),
-            ("Move OSB files to install folder", self._step_merge_osb_output),
-            ("Copy Steam assets", self._step_assets),
-            ("Download mods", self._step_mods),
-            ("Final OSB file copy & cleanup", self._step_final_osb_copy),
-        ]
-        self.progress["maximum"] = len(steps)
-
-        for i, (desc, func) in enumerate(steps, start=1):
-            self.log_write(f"→ {desc}…")
-            try:
-                func()
-                self.log_write(f"✔ {desc}")
-            except Exception as e:
-                self.log_write(f"✘ {desc}: {e}")
-                messagebox.showerror("Install Error", f"{desc} failed:\n{e}")
-                return
-            self.progress["value"] = i
-
-        self.next_btn.config(state="normal")
-
-    def _step_steam(self):
-        # Check if Steam.exe is running
-        out = subprocess.check_output(
-            ["tasklist", "/FI", "IMAGENAME eq Steam.exe"],
-            stderr=subprocess.DEVNULL, text=True
-        )
-        if "Steam.exe" not in out:
-            # Launch Steam
-            steam_root = ""
-            if winreg:
-                try:
-                    key = winreg.OpenKey(winreg.HKEY_CURRENT_USER,
-                                        r"Software\Valve\Steam")
-                    steam_root, _ = winreg.QueryValueEx(key, "SteamPath")
-                except Exception:
-                    pass
-            steam_exe = os.path.join(steam_root, "Steam.exe")
-            if os.path.isfile(steam_exe):
-                subprocess.Popen([steam_exe],
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL)
-                # Brief pause to let Steam start
-                import time; time.sleep(2)
-            else:
-                raise FileNotFoundError("Steam.exe not found.")
-        # Bring installer back to front
-        bring_to_front(self.master)
-
-    def _step_steamcmd(self):
-        dest = os.path.join(os.getcwd(), "steamcmd")
-        exe  = os.path.join(dest, "steamcmd.exe")
-        if not os.path.isfile(exe):
-            os.makedirs(dest, exist_ok=True)
-            data = urlopen(STEAMCMD_URL).read()
-            z = zipfile.ZipFile(BytesIO(data))
-            z.extractall(dest)
-
-    def _step_starbound(self):
-        m = self.master
-        sb_dir = m.steam_dir.get().strip()
-        exe = os.path.join(sb_dir, "starbound.exe")
-
-        if os.path.isfile(exe):
-            self.log_write(f"  → Found existing Starbound at: {sb_dir}")
-            return  # skip install
-
-        # Otherwise, install using SteamCMD
-        sb_dir = m.install_dir.get().strip()
-        m.steam_dir.set(sb_dir)  # update in GUI too
-
-        self.log_write(f"  → Installing Starbound to: {sb_dir}")
-        cmd = [
-            os.path.join(os.getcwd(), "steamcmd", "steamcmd.exe"),
-            "+force_install_dir", sb_dir,
-            "+login", "anonymous",
-            "+app_update", STARBOUND_APP_ID, "validate",
-            "+quit"
-        ]
-        subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
-
-    def _step_installer_release(self):
-        import urllib.request
-        from urllib.error import URLError
-
-        # Step 1: Resolve tag like v0.1.14
-        latest_url = "https://github.com/OpenStarbound/OpenStarbound/releases/latest"
-        req = urllib.request.Request(latest_url, method="HEAD")
-        with urllib.request.urlopen(req) as resp:
-            final_url = resp.geturl()
-
-        match = re.search(r"/tag/(v[\d\.]+)$", final_url)
-        if not match:
-            raise ValueError(f"Could not extract release tag from: {final_url}")
-        tag = match.group(1)
-        self.log_write(f"→ Latest OSB release: {tag}")
-
-        # Step 2: Build installer zip URL
-        installer_url = (
-            f"https://github.com/OpenStarbound/OpenStarbound/releases/download/"
-            f"{tag}/OpenStarbound-Windows-Installer.zip"
-        )
-        self.log_write("→ Downloading OSB installer ZIP…")
-
-        # Step 3: Download and unzip
-        data = urlopen(installer_url).read()
-        temp_dir = os.path.join(os.getcwd(), "osb_installer_temp")
-        if os.path.isdir(temp_dir):
-            shutil.rmtree(temp_dir)
-        os.makedirs(temp_dir, exist_ok=True)
-
-        with zipfile.ZipFile(BytesIO(data)) as z:
-            z.extractall(temp_dir)
-
-        # Step 4: Run installer (find .exe)
-        exe = None
-        for file in os.listdir(temp_dir):
-            if file.endswith(".exe"):
-                exe = os.path.join(temp_dir, file)
-                break
-
-        if not exe or not os.path.isfile(exe):
-            raise FileNotFoundError("Installer .exe not found in ZIP")
-
-        self.log_write(f"→ Running installer: {exe}")
-
-        # Step 5: Run with /NOICONS to avoid desktop shortcut
-        subprocess.Popen([exe, "/VERYSILENT", "/NOICONS", "/NORESTART"])
-
-    def _step_merge_osb_output(self):
-        import time
-
-        m = self.master
-        osb_src = r"C:\Program Files\OpenStarbound"
-        osb_dst = m.osb_dir.get()
-
-        self.log_write("→ Waiting for OSB installer to finish...")
-        timeout = 30
-        while not os.path.isdir(osb_src) and timeout > 0:
-            time.sleep(1)
-            timeout -= 1
-
-        if not os.path.isdir(osb_src):
-            raise FileNotFoundError("OSB output not found at C:\\Program Files\\OpenStarbound")
-
-        # Wait a little more to let all file ops finish
-        time.sleep(2)
-
-        self.log_write(f"→ Merging all files from {osb_src} → {osb_dst} (overwrite enabled)")
-        failed = []
-        for root, dirs, files in os.walk(osb_src):
-            rel_path = os.path.relpath(root, osb_src)
-            dst_dir = os.path.join(osb_dst, rel_path) if rel_path != "." else osb_dst
-
-            os.makedirs(dst_dir, exist_ok=True)
-
-            for f in files:
-                # Skip known temporary files that may disappear
-                if f.startswith("is-") and f.endswith(".tmp"):
-                    continue
-
-                src_file = os.path.join(root, f)
-                dst_file = os.path.join(dst_dir, f)
-
-                try:
-                    # Always replace the file, even if it exists
-                    if os.path.exists(dst_file):
-                        os.remove(dst_file)
-                    shutil.copy2(src_file, dst_file)
-                except Exception as e:
-                    failed.append((src_file, dst_file, str(e)))
-
-        if failed:
-            self.log_write("⚠ Some files could not be copied:")
-            for src, dst, err in failed:
-                self.log_write(f"   {src} → {dst} | {err}")
-
-        # Attempt to delete installer folder
-        self.log_write(f"→ Cleaning up {osb_src}")
-        try:
-            shutil.rmtree(osb_src)
-        except Exception as e:
-            self.log_write(f"⚠ Could not delete installer output: {e}")
-
-    def _step_assets(self):
-        m   = self.master
-        src = os.path.join(m.steam_dir.get(), "assets")
-        dst = os.path.join(m.osb_dir.get(), "assets")
-        if os.path.isdir(dst):
-            shutil.rmtree(dst)
-        shutil.copytree(src, dst)
-
-    def _step_final_osb_copy(self):
-        osb_src = r"C:\Program Files\OpenStarbound"
-        osb_dst = self.master.osb_dir.get()
-
-        if not os.path.isdir(osb_src):
-            return  # nothing left
-
-        self.log_write("→ Final pass: copying any remaining OSB files…")
-        for root, dirs, files in os.walk(osb_src):
-            rel_path = os.path.relpath(root, osb_src)
-            dst_dir = os.path.join(osb_dst, rel_path) if rel_path != "." else osb_dst
-            os.makedirs(dst_dir, exist_ok=True)
-
-            for f in files:
-                # Avoid temp/locked files but copy everything else
-                if f.startswith("is-") and f.endswith(".tmp"):
-                    continue
-
-                src_file = os.path.join(root, f)
-                dst_file = os.path.join(dst_dir, f)
-
-                try:
-                    if os.path.exists(dst_file):
-                        os.remove(dst_file)
-                    shutil.copy2(src_file, dst_file)
-                except Exception as e:
-                    self.log_write(f"⚠ Could not copy {f}: {e}")
-
-        # Try to delete the leftover Program Files folder one last time
-        try:
-            shutil.rmtree(osb_src)
-            self.log_write("→ Final cleanup: Program Files folder removed.")
-        except Exception as e:
-            self.log_write(f"⚠ Could not delete Program Files folder: {e}")
-
-    def _step_mods(self):
-        exe = os.path.join(os.getcwd(), "steamcmd", "steamcmd.exe")
-        for mod in WORKSHOP_MOD_IDS:
-            subprocess.check_call([
-                exe,
-                "+login", "anonymous",
-                "+workshop_download_item", STARBOUND_APP_ID, mod,
-                "+quit"
-            ], stdout=subprocess.DEVNULL)
-
-class StepFinish(tk.Frame):
-    def __init__(self, master):
-        super().__init__(master, padx=10, pady=10)
-        tk.Label(self, text="Step 3: Done!",
-                font=("Segoe UI", 12, "bold"))\
-        .pack(pady=(0,10))
-
-        tk.Checkbutton(self,
-                    text="Run Starbound now",
-                    variable=master.run_when_done)\
-        .pack()
-
-        btn_frame = tk.Frame(self)
-        btn_frame.pack(fill="x", pady=15)
-        tk.Button(btn_frame, text="← Back",
-                command=lambda: master.show_frame(StepInstall))\
-        .pack(side="left")
-        tk.Button(btn_frame, text="Finish", width=10,
-                command=self.finish)\
-        .pack(side="right")
-
-    def finish(self):
-        if self.master.run_when_done.get():
-            exe = os.path.join(self.master.osb_dir.get(),
-                            "win", "starbound.exe")
-            if os.path.isfile(exe):
-                subprocess.Popen([exe])
-            else:
-                messagebox.showwarning(
-                    "Warning", f"Could not find:\n{exe}"
-                )
-        self.master.destroy()
-
-if __name__ == "__main__":
-    libs     = get_steam_libraries()
-    existing = detect_starbound_install()
-    app      = InstallerWizard(libs, existing)
-    app.mainloop()
+import os
+import threading
+import subprocess
+import shutil
+import re
+import string
+import sys
+import time
+import select
+import stat
+import struct
+import json
+import hashlib
+import queue
+import random
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Windows registry access for Steam path detection
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+# Constants
+STEAMCMD_URL      = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
+STARBOUND_APP_ID  = "211820"
+WORKSHOP_MOD_IDS  = ["3534616750"]
+NIGHTLY_URL       = (
+    "https://nightly.link/OpenStarbound/OpenStarbound/"
+    "workflows/build/main/OpenStarbound-Windows-Client.zip"
+)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES    = 5
+DOWNLOAD_TIMEOUT    = 30
+HTTP_POOL_SIZE      = 4
+HTTP_SEGMENTS       = 4
+HTTP_SEGMENT_MIN    = 8 * 1024 * 1024
+HTTP_BACKOFF_BASE   = 0.5
+HTTP_BACKOFF_CAP    = 10
+INSTALL_MAX_WORKERS = 4
+HASH_CHUNK_SIZE     = 1024 * 1024
+CACHE_DIR           = os.path.join(os.getcwd(), "download_cache")
+CACHE_MAX_BYTES     = 2 * 1024 ** 3
+STEAMCMD_SESSIONS   = 1
+STEAMCMD_STALL_TIMEOUT = 180
+STEAMCMD_RETRIES    = 3
+STEAMCMD_POLL       = 5.0
+STEAMCMD_LOG_INTERVAL = 10.0
+INSTALLER_TIMEOUT   = 600
+INSTALLER_QUIET     = 2.0
+STEAM_INDEX_PATH    = os.path.join(os.getcwd(), "steam_index.json")
+LOG_PATH            = os.path.join(os.getcwd(), "osb_installer.log")
+JOURNAL_PATH        = os.path.join(os.getcwd(), "install_journal.json")
+# Steps whose output only exists once a later step is done; the journal
+# records them together with that step
+JOURNAL_WITH        = {"installer": "merge"}
+HASH_CACHE_PATH     = os.path.join(os.getcwd(), "hash_cache.json")
+BASELINE_PATH       = os.path.join(os.getcwd(), "verify_baseline.json")
+# Folders Steam and the game write to at run time, left out of the baseline
+BASELINE_SKIP       = ("steamapps", "storage", "logs")
+HASH_WORKERS        = min(8, (os.cpu_count() or 1) * 2)
+WORKSHOP_INDEX_PATH = os.path.join(os.getcwd(), "workshop_index.json")
+STEAM_API_URL       = "https://api.steampowered.com/ISteamRemoteStorage"
+OSB_LATEST_URL      = "https://github.com/OpenStarbound/OpenStarbound/releases/latest"
+OSB_RELEASE_URL     = ("https://github.com/OpenStarbound/OpenStarbound/releases/download/"
+                       "{tag}/OpenStarbound-Windows-Installer.zip")
+OSB_PROGRAM_DIR     = r"C:\Program Files\OpenStarbound"
+ASSET_MODES         = ("auto", "reflink", "hardlink", "sbinit", "copy")
+FICLONE             = 0x40049409
+ZIP_TAIL_SIZE       = 64 * 1024 + 22
+LOG_MAX_LINES       = 2000
+LOG_PUMP_MS         = 50
+LOG_PUMP_BUDGET     = 0.01
+COPY_WORKERS_SSD    = 8
+COPY_WORKERS_HDD    = 2
+EXTRACT_WORKERS     = min(8, os.cpu_count() or 1)
+TRACE_ENV           = "OSB_TRACE"
+FLEET_MANIFEST      = ".osb_fleet.json"
+FLEET_PRIVATE       = ("storage", "logs")
+
+def list_drives():
+    """Return a list of all mounted drive letters (e.g. ['C:\\','D:\\',…])."""
+    try:
+        from ctypes import windll
+    except ImportError:
+        return []  # not Windows
+
+    drives = []
+    mask = windll.kernel32.GetLogicalDrives()
+    for i, letter in enumerate(string.ascii_uppercase):
+        if mask & (1 << i):
+            drives.append(f"{letter}:\\")
+    return drives
+
+def tokenize_vdf(text):
+    """Yield '{', '}' or ('str', value) tokens from Valve KeyValues text."""
+    i, n = 0, len(text)
+    escapes = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+        elif c in "{}":
+            yield c
+            i += 1
+        elif c == "[":
+            # Platform conditionals like [$WIN32] carry no data we need
+            i = text.find("]", i)
+            i = n if i < 0 else i + 1
+        elif c == '"':
+            i += 1
+            buf = []
+            while i < n and text[i] != '"':
+                if text[i] == "\\" and i + 1 < n:
+                    buf.append(escapes.get(text[i + 1], text[i + 1]))
+                    i += 2
+                else:
+                    buf.append(text[i])
+                    i += 1
+            yield ("str", "".join(buf))
+            i += 1
+        else:
+            j = i
+            while j < n and not text[j].isspace() and text[j] not in '{}"':
+                j += 1
+            yield ("str", text[i:j])
+            i = j
+
+def parse_vdf(text):
+    """Parse Valve KeyValues (.vdf/.acf) text into nested dicts."""
+    root  = {}
+    stack = [root]
+    key   = None
+    for tok in tokenize_vdf(text):
+        if tok == "{":
+            if key is None:
+                raise ValueError("VDF block without a key")
+            child = {}
+            stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif tok == "}":
+            if len(stack) == 1:
+                raise ValueError("Unbalanced '}' in VDF")
+            stack.pop()
+        elif key is None:
+            key = tok[1]
+        else:
+            stack[-1][key] = tok[1]
+            key = None
+    return root
+
+def read_vdf(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return parse_vdf(f.read())
+
+def steam_roots():
+    """Steam install folders from the registry, plus the default location."""
+    def read_path(hive, flag):
+        try:
+            key = winreg.OpenKey(hive, r"Software\Valve\Steam", 0,
+                                winreg.KEY_READ | flag)
+            path, _ = winreg.QueryValueEx(key, "SteamPath")
+            return path
+        except OSError:
+            return None
+
+    roots = set()
+    if winreg:
+        for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            for view in (winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY):
+                path = read_path(hive, view)
+                if path:
+                    roots.add(os.path.normpath(path))
+
+    roots.add(r"C:\Program Files (x86)\Steam")  # fallback
+    return sorted(roots)
+
+def scan_steam(roots):
+    """
+    Read libraryfolders.vdf under each Steam root and, for the library that
+    owns Starbound, its appmanifest. Returns (libraries, starbound, sources)
+    where sources maps every file read to its mtime_ns.
+    """
+    libraries = []
+    starbound = ""
+    sources   = {}
+
+    for root in roots:
+        vdf_path = os.path.join(root, "steamapps", "libraryfolders.vdf")
+        try:
+            sources[vdf_path] = os.stat(vdf_path).st_mtime_ns
+            data = read_vdf(vdf_path)
+        except (OSError, ValueError):
+            continue
+
+        folders = data.get("libraryfolders") or data.get("LibraryFolders") or {}
+        for key, entry in folders.items():
+            if not key.isdigit():
+                continue
+            # New format: {"path": ..., "apps": {...}}; old format: just the path
+            path = entry.get("path") if isinstance(entry, dict) else entry
+            if not path:
+                continue
+            path = os.path.normpath(path)
+            if path not in libraries:
+                libraries.append(path)
+            apps = entry.get("apps", {}) if isinstance(entry, dict) else {}
+            if starbound or (apps and STARBOUND_APP_ID not in apps):
+                continue
+
+            acf = os.path.join(path, "steamapps", f"appmanifest_{STARBOUND_APP_ID}.acf")
+            try:
+                sources[acf] = os.stat(acf).st_mtime_ns
+                state = read_vdf(acf).get("AppState", {})
+            except (OSError, ValueError):
+                continue
+            candidate = os.path.join(path, "steamapps", "common",
+                                     state.get("installdir", "Starbound"))
+            if os.path.isfile(os.path.join(candidate, "starbound.exe")):
+                starbound = candidate
+
+    return libraries, starbound, sources
+
+def scan_drives(drives):
+    """
+    Fallback for libraries Steam doesn't list: <drive>\\SteamLibrary on
+    each drive.
+    """
+    print("→ No SB in registered libraries, scanning all drives for SteamLibrary…")
+    for drive in drives:
+        candidate = os.path.join(drive, "SteamLibrary", "steamapps", "common", "Starbound")
+        if os.path.isfile(os.path.join(candidate, "starbound.exe")):
+            print("→ Found via fallback scan:", candidate)
+            return candidate
+    return ""
+
+def steam_index(rescan=False):
+    """
+    Return {'libraries': [...], 'starbound': path} from the on-disk index,
+    rescanning only when the Steam roots, the drive letters or any VDF/ACF
+    file it was built from changed, or when rescan is set. If no library
+    has Starbound the drive fallback runs once and its result, including
+    "not found", is kept in the index as well.
+    """
+    roots = steam_roots()
+    drives = list_drives()
+    if not rescan:
+        try:
+            with open(STEAM_INDEX_PATH, encoding="utf-8") as f:
+                index = json.load(f)
+            if index["roots"] == roots and index["drives"] == drives and all(
+                os.stat(path).st_mtime_ns == mtime
+                for path, mtime in index["sources"].items()
+            ):
+                return index
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    libraries, starbound, sources = scan_steam(roots)
+    if not starbound:
+        starbound = scan_drives(drives)
+    index = {"roots": roots, "drives": drives, "sources": sources,
+             "libraries": libraries, "starbound": starbound}
+    try:
+        write_json_atomic(STEAM_INDEX_PATH, index)
+    except OSError:
+        pass  # read-only working dir, just rescan next time
+    return index
+
+def get_steam_libraries(index=None):
+    """
+    Return every Steam library folder listed in libraryfolders.vdf.
+    index is a steam_index() result to reuse; it is loaded if not given.
+    """
+    found_paths = [p for p in (index or steam_index())["libraries"] if os.path.isdir(p)]
+
+    print("→ Found Steam libraries:")
+    for path in found_paths:
+        print("   ", path)
+
+    return found_paths
+
+def detect_starbound_install(index=None):
+    """
+    Return the path to the Starbound install if found (including starbound.exe),
+    otherwise return empty string. index is a steam_index() result to reuse.
+    """
+    path = (index or steam_index())["starbound"]
+    if path and not os.path.isfile(os.path.join(path, "starbound.exe")):
+        path = steam_index(rescan=True)["starbound"]  # moved since the index was built
+    if path:
+        print(f"→ Found Starbound install: {path}")
+        return path
+
+    print("→ No existing Starbound install detected.")
+    return ""
+
+class NullSpan:
+    """What Tracer.span returns while tracing is off: does nothing."""
+
+    def add(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    """
+    One timed region; add() accumulates counters such as bytes_written.
+    On exit the counters are also added to the enclosing span on the same
+    thread, so a step's totals include the primitives it ran.
+    """
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name   = name
+        self.cat    = cat
+        self.args   = args
+        self.counts = {}
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.tracer.stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        end = time.perf_counter_ns()
+        stack = self.tracer.stack()
+        stack.pop()
+        if stack:
+            stack[-1].add(**self.counts)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self, end)
+
+class Tracer:
+    """
+    Collects spans for the install steps and the I/O primitives under them.
+    Enabled by setting OSB_TRACE to an output prefix (or to 1 for
+    ./osb_trace); save() then writes <prefix>.trace.json in Chrome
+    trace_event format (load it in chrome://tracing or Perfetto) and
+    <prefix>.metrics.json with per-span totals. While disabled span()
+    hands back a shared no-op, so instrumented code pays one call.
+    """
+
+    def __init__(self, prefix=None):
+        self.prefix  = prefix
+        self.enabled = bool(prefix)
+        self.lock    = threading.Lock()
+        self.origin  = time.perf_counter_ns()
+        self.events  = []
+        self.threads = {}
+        self.local   = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        value = os.environ.get(TRACE_ENV, "").strip()
+        if value.lower() in ("", "0", "false", "no"):
+            return cls()
+        if value.lower() in ("1", "true", "yes"):
+            value = os.path.join(os.getcwd(), "osb_trace")
+        return cls(value)
+
+    def span(self, name, cat="io", **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, cat, args)
+
+    def stack(self):
+        """Spans open on the calling thread, innermost last."""
+        if not hasattr(self.local, "spans"):
+            self.local.spans = []
+        return self.local.spans
+
+    def record(self, span, end):
+        args = dict(span.args, **span.counts)
+        seconds = (end - span.start) / 1e9
+        moved = span.counts.get("bytes_read", 0) + span.counts.get("bytes_written", 0)
+        if moved and seconds > 0:
+            args["mb_per_s"] = round(moved / 1024 ** 2 / seconds, 2)
+        tid = threading.get_ident()
+        with self.lock:
+            self.threads.setdefault(tid, threading.current_thread().name)
+            self.events.append({
+                "name": span.name, "cat": span.cat, "ph": "X",
+                "ts": (span.start - self.origin) / 1000,
+                "dur": (end - span.start) / 1000,
+                "pid": os.getpid(), "tid": tid, "args": args,
+            })
+
+    def metrics(self):
+        """{span name: count, wall seconds, byte/file totals, MB/s}."""
+        totals = {}
+        with self.lock:
+            events = list(self.events)
+        for event in events:
+            entry = totals.setdefault(event["name"], {
+                "count": 0, "wall_s": 0.0, "bytes_read": 0,
+                "bytes_written": 0, "files": 0, "errors": 0,
+            })
+            entry["count"] += 1
+            entry["wall_s"] += event["dur"] / 1e6
+            for key in ("bytes_read", "bytes_written", "files"):
+                entry[key] += event["args"].get(key, 0)
+            entry["errors"] += "error" in event["args"]
+        for entry in totals.values():
+            entry["wall_s"] = round(entry["wall_s"], 6)
+            moved = entry["bytes_read"] + entry["bytes_written"]
+            entry["mb_per_s"] = round(moved / 1024 ** 2 / entry["wall_s"], 2) \
+                if moved and entry["wall_s"] else 0.0
+        return totals
+
+    def save(self):
+        """Write both files; returns the trace path, or None when disabled."""
+        if not self.enabled:
+            return None
+        with self.lock:
+            events = list(self.events)
+            names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(),
+                      "tid": tid, "args": {"name": name}}
+                     for tid, name in self.threads.items()]
+        trace_path = self.prefix + ".trace.json"
+        write_json_atomic(trace_path, {"traceEvents": names + events,
+                                       "displayTimeUnit": "ms"})
+        write_json_atomic(self.prefix + ".metrics.json", self.metrics())
+        return trace_path
+
+TRACE = Tracer.from_env()
+
+class PooledResponse:
+    """
+    An http.client response that hands its connection back to the pool once
+    the body has been read completely; otherwise the connection is closed.
+    """
+
+    def __init__(self, client, key, conn, resp, url):
+        self.client  = client
+        self.key     = key
+        self.conn    = conn
+        self.resp    = resp
+        self.url     = url
+        self.status  = resp.status
+        self.headers = resp.headers
+
+    def read(self, amt=None):
+        return self.resp.read(amt)
+
+    def read1(self, amt=-1):
+        """Return up to amt bytes as soon as any have arrived."""
+        data = self.resp.read1(amt)
+        if self.resp.length == 0:
+            self.resp.read()  # marks the body complete so the connection is reused
+        return data
+
+    def geturl(self):
+        return self.url
+
+    def close(self):
+        if self.conn is None:
+            return
+        if self.resp.isclosed() and not self.resp.will_close:
+            self.client.release(self.key, self.conn)
+        else:
+            self.resp.close()
+            self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Cancelled(Exception):
+    """Raised by a long-running operation once its cancel event is set."""
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("Cancelled because another step failed")
+
+class HttpClient:
+    """
+    Small HTTP/1.1 client with per-host keep-alive pools. Redirects are
+    followed on pooled connections, failed requests are retried with
+    exponential backoff and full jitter, and large downloads can be split
+    into parallel Range segments written straight into one file.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=DOWNLOAD_TIMEOUT,
+                 retries=DOWNLOAD_RETRIES):
+        self.pool_size = pool_size
+        self.timeout   = timeout
+        self.retries   = retries
+        self.idle      = {}
+        self.lock      = threading.Lock()
+
+    def acquire(self, key):
+        import http.client
+
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def release(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def backoff(self, attempt, cancel=None):
+        delay = random.uniform(0, min(HTTP_BACKOFF_CAP, HTTP_BACKOFF_BASE * 2 ** attempt))
+        if cancel is None:
+            time.sleep(delay)
+        elif cancel.wait(delay):
+            check_cancelled(cancel)
+
+    def open(self, url, method="GET", headers=None, max_redirects=5):
+        """
+        Send a request and return a PooledResponse for the final URL after
+        redirects. Statuses >= 400 raise HTTPError; 5xx and connection
+        errors are retried first. A dead keep-alive connection is retried
+        straight away on a fresh one.
+        """
+        import http.client
+        from urllib.parse import urlsplit, urljoin
+        from urllib.error import HTTPError
+
+        attempt = 0
+        redirects = 0
+        while True:
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.hostname,
+                   parts.port or (443 if parts.scheme == "https" else 80))
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            conn, reused = self.acquire(key)
+            try:
+                conn.request(method, path, headers=dict(headers or {}))
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused:
+                    continue
+                if attempt >= self.retries:
+                    raise ConnectionError(f"{url}: {e}") from e
+                attempt += 1
+                self.backoff(attempt)
+                continue
+
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                resp.read()
+                PooledResponse(self, key, conn, resp, url).close()
+                redirects += 1
+                if redirects > max_redirects:
+                    raise ConnectionError(f"Too many redirects for {url}")
+                url = urljoin(url, resp.getheader("Location"))
+                if resp.status == 303:
+                    method = "GET"
+                continue
+
+            if resp.status >= 400:
+                body = resp.read()
+                PooledResponse(self, key, conn, resp, url).close()
+                if resp.status >= 500 and attempt < self.retries:
+                    attempt += 1
+                    self.backoff(attempt)
+                    continue
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            return PooledResponse(self, key, conn, resp, url)
+
+    def download(self, url, dest, progress=None, headers=None, meta=None,
+                 segments=1, chunk_size=DOWNLOAD_CHUNK_SIZE, cancel=None):
+        """
+        Download url to dest through a preallocated '.part' file.
+        A one-byte Range probe (carrying any conditional headers) finds the
+        size and whether ranges work. Files of at least HTTP_SEGMENT_MIN are
+        then fetched as `segments` parallel ranges, each resuming from its
+        last byte after a failure; If-Range guards against the file changing
+        underneath. Servers without range support get one plain stream,
+        started over if it drops. A 304 is raised as HTTPError. Setting
+        cancel stops every segment with Cancelled.
+        """
+        with TRACE.span("download", url=url) as span:
+            size = self.download_to(url, dest, progress, headers, meta,
+                                    segments, chunk_size, cancel)
+            span.add(bytes_read=size, bytes_written=size, files=1)
+        return dest
+
+    def download_to(self, url, dest, progress, headers, meta, segments, chunk_size, cancel):
+        """Does the work for download(); returns the number of bytes received."""
+        import http.client
+        from urllib.error import HTTPError
+
+        part = dest + ".part"
+        if os.path.exists(part):
+            os.remove(part)  # stale from an earlier run, size can't be trusted
+
+        probe = dict(headers or {})
+        probe["Range"] = "bytes=0-0"
+        try:
+            resp = self.open(url, headers=probe)
+        except HTTPError as e:
+            if e.code != 416:
+                raise
+            resp = self.open(url, headers=headers)  # empty file
+        with resp:
+            if resp.status == 304:
+                raise HTTPError(url, 304, "Not Modified", resp.headers, None)
+            etag = resp.headers.get("ETag")
+            if meta is not None:
+                meta["etag"] = etag
+                meta["last_modified"] = resp.headers.get("Last-Modified")
+            final_url = resp.url
+            if resp.status != 206:
+                return self.download_whole(resp, dest, progress, headers, chunk_size, cancel)
+            resp.read()
+            total = int(resp.headers["Content-Range"].rsplit("/", 1)[1])
+
+        with open(part, "wb") as f:
+            f.truncate(total)  # preallocate
+        count = segments if total >= HTTP_SEGMENT_MIN else 1
+        bounds = [(total * i // count, total * (i + 1) // count - 1) for i in range(count)]
+        lock = threading.Lock()
+        received = [0]
+
+        def fetch_segment(bound):
+            pos, end = bound
+            attempt = 0
+            while pos <= end:
+                seg_headers = {"Range": f"bytes={pos}-{end}"}
+                if etag:
+                    seg_headers["If-Range"] = etag
+                try:
+                    with self.open(final_url, headers=seg_headers) as r, \
+                            open(part, "r+b") as f:
+                        if r.status != 206:
+                            raise ValueError(f"{url} changed during download")
+                        f.seek(pos)
+                        while pos <= end:
+                            check_cancelled(cancel)
+                            chunk = r.read1(min(chunk_size, end - pos + 1))
+                            if not chunk:
+                                raise ConnectionError("connection closed early")
+                            f.write(chunk)
+                            pos += len(chunk)
+                            with lock:
+                                received[0] += len(chunk)
+                                done = received[0]
+                            if progress:
+                                progress(done, total)
+                except (OSError, http.client.HTTPException) as e:
+                    if isinstance(e, HTTPError) and e.code < 500 or attempt >= self.retries:
+                        raise
+                    attempt += 1
+                    self.backoff(attempt, cancel)
+
+        if count == 1:
+            fetch_segment(bounds[0])
+        else:
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                list(pool.map(fetch_segment, bounds))
+        os.replace(part, dest)
+        return total
+
+    def download_whole(self, resp, dest, progress, headers, chunk_size, cancel):
+        """
+        Stream a response from a server without range support into dest's
+        '.part' file. A dropped connection starts the body over from zero,
+        after the same backoff as everywhere else. Returns the size.
+        """
+        import http.client
+        from urllib.error import HTTPError
+
+        part = dest + ".part"
+        attempt = 0
+        while True:
+            try:
+                total = resp.headers.get("Content-Length")
+                total = int(total) if total is not None else None
+                with open(part, "wb") as f:
+                    if total:
+                        f.truncate(total)
+                    done = 0
+                    while chunk := resp.read1(chunk_size):
+                        check_cancelled(cancel)
+                        f.write(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, total)
+                    if total is not None and done < total:
+                        raise ConnectionError(f"{resp.url}: connection closed early")
+                    f.truncate(done)
+                break
+            except (OSError, http.client.HTTPException):
+                resp.close()
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.backoff(attempt, cancel)
+                resp = self.open(resp.url, headers=headers)
+                if resp.status == 304:
+                    resp.close()
+                    raise HTTPError(resp.url, 304, "Not Modified", resp.headers, None)
+        resp.close()
+        os.replace(part, dest)
+        return done
+
+HTTP = HttpClient()
+
+def download_file(url, dest, progress=None, headers=None, meta=None, segments=1,
+                  cancel=None):
+    """
+    Download url to dest through the shared keep-alive client; see
+    HttpClient.download. progress(done, total) is called after every chunk.
+    headers are extra request headers (e.g. If-None-Match); a 304 is raised
+    as HTTPError. If meta is a dict it is filled with the response's 'etag'
+    and 'last_modified'.
+    """
+    return HTTP.download(url, dest, progress=progress, headers=headers,
+                         meta=meta, segments=segments, cancel=cancel)
+
+class StepFailed(Exception):
+    """Raised by run_step_graph when a step fails; wraps the original error."""
+
+    def __init__(self, desc, error):
+        super().__init__(f"{desc} failed:\n{error}")
+        self.desc  = desc
+        self.error = error
+
+def run_step_graph(steps, max_workers=INSTALL_MAX_WORKERS,
+                   on_start=None, on_done=None, cancel=None):
+    """
+    Run (name, desc, func, deps) steps on a thread pool, starting each one as
+    soon as every step named in deps has finished.
+    on_start(name, desc) and on_done(name, desc, error) are called from the
+    worker threads. On the first failure no new steps are started, queued
+    ones are cancelled and the cancel event (if given) is set so long-running
+    steps can bail out; StepFailed is raised once running steps return.
+    """
+    by_name = {}
+    for name, desc, func, deps in steps:
+        by_name[name] = (desc, func, set(deps))
+    for name, (_, _, deps) in by_name.items():
+        unknown = deps - by_name.keys()
+        if unknown:
+            raise ValueError(f"Step {name!r} depends on unknown steps: {sorted(unknown)}")
+
+    def run(name, desc, func):
+        if on_start:
+            on_start(name, desc)
+        try:
+            with TRACE.span(f"step:{name}", "step", desc=desc):
+                func()
+        except Exception as e:
+            if on_done:
+                on_done(name, desc, e)
+            raise
+        if on_done:
+            on_done(name, desc, None)
+
+    pending = dict(by_name)
+    finished = set()
+    running = {}
+    failure = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit_ready():
+            ready = [n for n, (_, _, deps) in pending.items() if deps <= finished]
+            for name in ready:
+                desc, func, _ = pending.pop(name)
+                running[pool.submit(run, name, desc, func)] = (name, desc)
+            if not running and pending:
+                raise ValueError(f"Step graph has a cycle: {sorted(pending)}")
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, desc = running.pop(fut)
+                if fut.cancelled():
+                    continue
+                error = fut.exception()
+                if error is None:
+                    finished.add(name)
+                elif failure is None:
+                    failure = StepFailed(desc, error)
+                    if cancel is not None:
+                        cancel.set()
+                    for other in running:
+                        other.cancel()
+            if failure is None:
+                submit_ready()
+
+    if failure is not None:
+        raise failure
+
+def iter_files(root, rel="", skip=None):
+    """
+    Yield (relative path, DirEntry) for every file under root. skip(rel)
+    leaves out files and whole folders.
+    """
+    with os.scandir(os.path.join(root, rel) if rel else root) as it:
+        for entry in it:
+            path = f"{rel}/{entry.name}" if rel else entry.name
+            if skip and skip(path):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(root, path, skip)
+            elif entry.is_file():
+                yield path, entry
+
+def hash_file(path):
+    """Fast BLAKE2 digest of a file, read in chunks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+def build_manifest(root, hash_files=False):
+    """
+    Map every file under root to [size, mtime_ns, hash]. Paths are relative
+    and '/'-separated; hash is None unless hash_files is set.
+    """
+    manifest = {}
+    for rel, entry in iter_files(root):
+        st = entry.stat()
+        digest = hash_file(entry.path) if hash_files else None
+        manifest[rel] = [st.st_size, st.st_mtime_ns, digest]
+    return manifest
+
+def load_manifest(path):
+    """Return the files map stored at path, or {} if missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+def write_json_atomic(path, data):
+    """Write data as JSON to path atomically (temp file + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def write_manifest(path, manifest):
+    """Write a manifest atomically."""
+    write_json_atomic(path, {"version": 1, "files": manifest})
+
+def remove_synced(dst, rels):
+    """Delete the given manifest paths from dst, plus any emptied folders."""
+    removed = 0
+    for rel in rels:
+        target = os.path.join(dst, *rel.split("/"))
+        try:
+            os.remove(target)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        # Drop directories left empty by the removal
+        parent = os.path.dirname(target)
+        while os.path.normcase(parent) != os.path.normcase(dst):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+    return removed
+
+def sync_tree(src, dst, manifest_path, hash_files=False, copy=None, skip=None,
+              inodes=None):
+    """
+    Make dst mirror src, copying only new or changed files and deleting only
+    files a previous sync put there that are gone from src. Anything else in
+    dst is left alone. Returns (copied, removed).
+    A file is copied when the destination is missing or its size/mtime no
+    longer match the source (copy keeps mtimes), or, with hash_files, when
+    its hash differs from the one recorded last time. Files are copied with
+    copy_file_atomic, which replaces the target rather than writing into
+    it, so a target hardlinked elsewhere (e.g. a fleet folder) never changes
+    under the other link. copy(src, dst) can be swapped for a linking
+    function that does the same, and skip(rel) leaves paths out of the sync
+    entirely. inodes="shared" counts a target that is not a hardlink to its
+    source as changed, and inodes="separate" one that is, so switching
+    between linking and copying redoes every file.
+    """
+    copy = copy or copy_file_atomic
+    previous = load_manifest(manifest_path)
+    current  = build_manifest(src, hash_files=hash_files)
+    if skip:
+        current = {rel: v for rel, v in current.items() if not skip(rel)}
+
+    copied = 0
+    with TRACE.span("sync", src=src, dst=dst) as span:
+        for rel, (size, mtime_ns, digest) in current.items():
+            target = os.path.join(dst, *rel.split("/"))
+            try:
+                st = os.stat(target)
+                unchanged = st.st_size == size and st.st_mtime_ns == mtime_ns
+            except OSError:
+                unchanged = False
+            if unchanged and hash_files:
+                old = previous.get(rel)
+                unchanged = bool(old) and old[2] == digest
+            if unchanged and inodes:
+                src_st = os.stat(os.path.join(src, *rel.split("/")))
+                shared = (st.st_dev, st.st_ino) == (src_st.st_dev, src_st.st_ino)
+                unchanged = shared == (inodes == "shared")
+            if unchanged:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            copy(os.path.join(src, *rel.split("/")), target)
+            copied += 1
+            span.add(bytes_read=size, bytes_written=size, files=1)
+
+    removed = remove_synced(dst, previous.keys() - current.keys())
+    write_manifest(manifest_path, current)
+    return copied, removed
+
+CopyResult = namedtuple("CopyResult", "src dst size error")
+
+def is_installer_temp(name):
+    """Inno Setup scratch files ('is-XXXX.tmp') that may vanish mid-copy."""
+    return name.startswith("is-") and name.endswith(".tmp")
+
+def copy_workers_for(path):
+    """
+    Pick a copy pool size for the disk holding path: a few workers on a
+    spinning disk (seeks dominate), more on SSDs, never more than there are
+    CPUs. Only Linux exposes the disk type cheaply, everything else gets the
+    SSD default.
+    """
+    return min(disk_copy_workers(path), os.cpu_count() or 1)
+
+def disk_copy_workers(path):
+    if sys.platform.startswith("linux"):
+        try:
+            dev = os.stat(path).st_dev
+            sys_dir = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+            # Partitions keep the queue settings on their parent device
+            for queue in (os.path.join(sys_dir, "queue"),
+                          os.path.join(sys_dir, "..", "queue")):
+                rot = os.path.join(queue, "rotational")
+                if os.path.isfile(rot):
+                    with open(rot) as f:
+                        if f.read().strip() == "1":
+                            return COPY_WORKERS_HDD
+                    break
+        except OSError:
+            pass
+    return COPY_WORKERS_SSD
+
+def copy_file_atomic(src, dst):
+    """
+    Copy src to a temp file beside dst, then rename it over dst so readers
+    never see a half-written file. Uses copy_file_range where the OS has it,
+    setting mode and times on the open file; shutil.copyfile already falls
+    back to sendfile/fcopyfile/big-buffer reads. Returns the number of bytes
+    copied.
+    """
+    tmp = f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        size = None
+        if hasattr(os, "copy_file_range"):
+            try:
+                with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+                    st = os.fstat(fsrc.fileno())
+                    remaining = size = st.st_size
+                    while remaining > 0:
+                        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                        if n == 0:
+                            break
+                        remaining -= n
+                    if remaining:
+                        size = None
+                    else:
+                        os.chmod(fdst.fileno(), stat.S_IMODE(st.st_mode))
+                        os.utime(fdst.fileno(), ns=(st.st_atime_ns, st.st_mtime_ns))
+            except OSError:
+                size = None  # e.g. cross-filesystem on older kernels
+        if size is None:
+            shutil.copyfile(src, tmp)
+            size = os.path.getsize(tmp)
+            shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+        return size
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def copy_tree(src, dst, skip=None, max_workers=None, cancel=None):
+    """
+    Copy everything under src into dst, overwriting existing files unless
+    they already have the same size and mtime. Directories are created up
+    front, then files are copied on a thread pool with copy_file_atomic.
+    skip(name) can exclude files by name.
+    Returns a list of CopyResult, one per file; failed copies have error set.
+    Raises Cancelled, leaving the remaining files alone, once cancel is set.
+    """
+    jobs = []
+
+    def walk(src_dir, dst_dir):
+        os.makedirs(dst_dir, exist_ok=True)
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    walk(entry.path, target)
+                elif entry.is_file() and not (skip and skip(entry.name)):
+                    jobs.append((entry.path, target))
+
+    walk(src, dst)
+
+    def copy_one(job):
+        src_file, dst_file = job
+        check_cancelled(cancel)
+        try:
+            st = os.stat(src_file)
+            try:
+                old = os.stat(dst_file)
+                if (old.st_size, old.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+                    return CopyResult(src_file, dst_file, 0, None)
+            except FileNotFoundError:
+                pass
+            return CopyResult(src_file, dst_file, copy_file_atomic(src_file, dst_file), None)
+        except Exception as e:
+            return CopyResult(src_file, dst_file, 0, e)
+
+    if max_workers is None:
+        max_workers = copy_workers_for(dst)
+    with TRACE.span("copy", src=src, dst=dst, workers=max_workers) as span:
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(copy_one, jobs))
+        else:
+            results = [copy_one(job) for job in jobs]
+        size = sum(r.size for r in results)
+        span.add(bytes_read=size, bytes_written=size,
+                 files=sum(1 for r in results if not r.error))
+    return results
+
+class DownloadCache:
+    """
+    Local artifact cache. Bodies are stored once under their content hash in
+    blobs/, and index.json maps each URL to its blob plus the ETag and
+    Last-Modified it was served with. fetch() revalidates with a conditional
+    request and reuses the blob on a 304. Once the blobs exceed max_bytes the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root       = root
+        self.max_bytes  = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.lock       = threading.Lock()
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest)
+
+    def lookup(self, url):
+        """Return the index entry for url if its blob is still on disk."""
+        with self.lock:
+            entry = self.index.get(url)
+            if entry and os.path.isfile(self.blob_path(entry["hash"])):
+                return dict(entry)
+            return None
+
+    def fetch(self, url, progress=None, cancel=None):
+        """Return the path of an up-to-date local copy of url."""
+        from urllib.error import URLError, HTTPError
+
+        os.makedirs(os.path.join(self.root, "blobs"), exist_ok=True)
+        entry = self.lookup(url)
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        tmp = os.path.join(self.root, f"incoming-{threading.get_ident()}")
+        meta = {}
+        try:
+            download_file(url, tmp, progress=progress, headers=headers, meta=meta,
+                          segments=HTTP_SEGMENTS, cancel=cancel)
+        except HTTPError as e:
+            if e.code != 304 or not entry:
+                raise
+            self.touch(url)
+            return self.blob_path(entry["hash"])
+        except (URLError, OSError):
+            if not entry:
+                raise
+            # Offline: the cached copy is better than nothing
+            self.touch(url)
+            return self.blob_path(entry["hash"])
+
+        digest = hash_file(tmp)
+        blob = self.blob_path(digest)
+        size = os.path.getsize(tmp)
+        if os.path.isfile(blob):
+            os.remove(tmp)
+        else:
+            os.replace(tmp, blob)
+
+        with self.lock:
+            self.index[url] = {
+                "hash": digest,
+                "size": size,
+                "etag": meta.get("etag"),
+                "last_modified": meta.get("last_modified"),
+                "used": time.time(),
+            }
+            self.evict(keep=digest)
+            write_json_atomic(self.index_path, self.index)
+        return blob
+
+    def touch(self, url):
+        with self.lock:
+            self.index[url]["used"] = time.time()
+            write_json_atomic(self.index_path, self.index)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until blobs fit in max_bytes."""
+        sizes = {e["hash"]: e["size"] for e in self.index.values()}
+        total = sum(sizes.values())
+        for url, entry in sorted(self.index.items(), key=lambda kv: kv[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            if entry["hash"] == keep:
+                continue
+            del self.index[url]
+            # Blobs are shared between URLs with identical content
+            if all(e["hash"] != entry["hash"] for e in self.index.values()):
+                try:
+                    os.remove(self.blob_path(entry["hash"]))
+                except FileNotFoundError:
+                    pass
+                total -= sizes[entry["hash"]]
+
+def steamcmd_script(install_dir=None, app_id=None, validate=False,
+                    workshop_items=()):
+    """Build a SteamCMD runscript for one anonymous session."""
+    lines = ["@ShutdownOnFailedCommand 1", "@NoPromptForPassword 1"]
+    if install_dir:
+        # Must come before login
+        lines.append(f'force_install_dir "{install_dir}"')
+    lines.append("login anonymous")
+    if app_id:
+        lines.append(f"app_update {app_id}" + (" validate" if validate else ""))
+    for item in workshop_items:
+        lines.append(f"workshop_download_item {STARBOUND_APP_ID} {item}")
+    lines.append("quit")
+    return "\n".join(lines) + "\n"
+
+SteamCmdEvent = namedtuple("SteamCmdEvent", "kind item state done total rate eta")
+
+STEAMCMD_PATTERNS = [
+    # Update state (0x61) downloading, progress: 45.12 (1234567 / 2736482)
+    ("progress", re.compile(
+        r"Update state \(0x[0-9a-fA-F]+\) ([^,]+), progress: [\d.]+ \((\d+) / (\d+)\)")),
+    ("item_start", re.compile(r"Downloading item (\d+)")),
+    ("item_done", re.compile(r"Success\. Downloaded item (\d+) .*\((\d+) bytes\)")),
+    ("item_failed", re.compile(r"ERROR! (?:Download item (\d+) failed \(([^)]*)\)"
+                               r"|(Timeout) downloading item (\d+))")),
+    ("app_done", re.compile(r"Success! App '(\d+)' fully installed")),
+    ("app_failed", re.compile(r"Error! App '(\d+)' state is (0x[0-9a-fA-F]+)")),
+]
+
+def parse_steamcmd_line(line):
+    """Turn one line of SteamCMD output into a SteamCmdEvent, or None."""
+    for kind, pattern in STEAMCMD_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        g = match.groups()
+        if kind == "progress":
+            return SteamCmdEvent(kind, None, g[0].strip(), int(g[1]), int(g[2]), None, None)
+        if kind == "item_done":
+            return SteamCmdEvent(kind, g[0], None, int(g[1]), int(g[1]), None, None)
+        if kind == "item_failed":
+            item, reason = (g[0], g[1]) if g[0] else (g[3], g[2])
+            return SteamCmdEvent(kind, item, reason, None, None, None, None)
+        if kind == "app_failed":
+            return SteamCmdEvent(kind, g[0], g[1], None, None, None, None)
+        return SteamCmdEvent(kind, g[0], None, None, None, None, None)
+    return None
+
+class RateMeter:
+    """Smoothed bytes/second and ETA from successive (done, total) samples."""
+
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.rate = None
+        self.last = None
+
+    def update(self, done, total, now):
+        """Returns (bytes per second, seconds left); either may be None."""
+        if self.last is not None:
+            then, before = self.last
+            if done < before:
+                self.rate = None  # a new phase started counting from zero
+            elif now > then:
+                sample = (done - before) / (now - then)
+                self.rate = sample if self.rate is None else \
+                    self.rate + self.smoothing * (sample - self.rate)
+        self.last = (now, done)
+        eta = (total - done) / self.rate if self.rate and total else None
+        return self.rate, eta
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def steamcmd_staged_bytes(root):
+    """Bytes SteamCMD has staged under root for app and workshop downloads."""
+    total = 0
+    for sub in (("steamapps", "downloading"), ("steamapps", "workshop", "downloads")):
+        path = os.path.join(root, *sub)
+        if os.path.isdir(path):
+            total += sum(entry.stat().st_size for _, entry in iter_files(path))
+    return total
+
+def read_lines(stream, lines):
+    """Split a byte stream on CR or LF into lines.put(str); None at EOF."""
+    buf = b""
+    try:
+        with stream:
+            while chunk := os.read(stream.fileno(), 65536):
+                parts = re.split(rb"[\r\n]", buf + chunk)
+                buf = parts.pop()
+                for part in parts:
+                    if part:
+                        lines.put(part.decode("utf-8", "replace"))
+    except OSError:
+        pass
+    if buf:
+        lines.put(buf.decode("utf-8", "replace"))
+    lines.put(None)
+
+def run_steamcmd(args, on_event=None, staging=None,
+                 stall_timeout=STEAMCMD_STALL_TIMEOUT, retries=STEAMCMD_RETRIES,
+                 cancel=None):
+    """
+    Run SteamCMD, parsing its output as it arrives (a helper thread reads
+    the pipe, so nothing blocks on it) and passing each SteamCmdEvent to
+    on_event. Progress events carry a smoothed byte rate and an ETA.
+    The session counts as stalled when neither the reported bytes nor the
+    size of the staging folders under staging change and no other output
+    appears for stall_timeout seconds; it is then killed and started again
+    (SteamCMD resumes partial downloads), with a 'retry' event. Raises
+    CalledProcessError on a failed exit, TimeoutError if every attempt
+    stalled. Setting cancel kills the process and raises Cancelled.
+    """
+    for attempt in range(retries + 1):
+        if attempt and on_event:
+            on_event(SteamCmdEvent("retry", None, None, attempt, retries, None, None))
+        proc = subprocess.Popen(args, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        lines = queue.Queue()
+        threading.Thread(target=read_lines, args=(proc.stdout, lines), daemon=True).start()
+
+        meter = RateMeter()
+        last = None
+        staged = steamcmd_staged_bytes(staging) if staging else None
+        moved_at = polled_at = time.monotonic()
+        finished = False
+        try:
+            while True:
+                try:
+                    line = lines.get(timeout=1.0)
+                except queue.Empty:
+                    line = ""
+                if line is None:
+                    finished = True
+                    break
+                now = time.monotonic()
+                event = parse_steamcmd_line(line) if line else None
+                if event is not None and event.kind == "progress":
+                    if (event.state, event.done) != last:
+                        last = (event.state, event.done)
+                        moved_at = now
+                    rate, eta = meter.update(event.done, event.total, now)
+                    event = event._replace(rate=rate, eta=eta)
+                elif line:
+                    moved_at = now
+                if event is not None and on_event:
+                    on_event(event)
+
+                if staging and now - polled_at >= STEAMCMD_POLL:
+                    polled_at = now
+                    size = steamcmd_staged_bytes(staging)
+                    if size != staged:
+                        staged = size
+                        moved_at = now
+                if now - moved_at > stall_timeout:
+                    break
+                check_cancelled(cancel)
+        finally:
+            if not finished:
+                proc.kill()  # stalled, or on_event raised
+            code = proc.wait()
+
+        if finished:
+            if code != 0:
+                raise subprocess.CalledProcessError(code, args)
+            return
+    raise TimeoutError(f"SteamCMD made no progress for {stall_timeout}s, "
+                       f"{retries + 1} attempt(s)")
+
+def run_steamcmd_batch(exe, install_dir=None, workshop_items=(),
+                       sessions=STEAMCMD_SESSIONS, validate=True, on_event=None,
+                       cancel=None):
+    """
+    Install/update Starbound into install_dir (if given) and download every
+    workshop item, paying SteamCMD's self-update and login cost once per
+    session instead of once per item. With sessions > 1 the items are split
+    across that many SteamCMD processes run in parallel; only the first one
+    runs app_update. Workshop content lands under install_dir when given,
+    otherwise under SteamCMD's own steamapps folder.
+    on_event(session, event) receives each session's SteamCmdEvents.
+    """
+    items = list(dict.fromkeys(workshop_items))  # dedupe, keep order
+    sessions = max(1, min(sessions, len(items)))
+    scripts = []
+    for i in range(sessions):
+        scripts.append(steamcmd_script(
+            install_dir,
+            app_id=STARBOUND_APP_ID if install_dir and i == 0 else None,
+            validate=validate,
+            workshop_items=items[i::sessions],
+        ))
+
+    def run(i):
+        path = os.path.join(os.path.dirname(exe), f"osb_batch_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(scripts[i])
+        try:
+            with TRACE.span("steamcmd", "process", session=i,
+                            items=len(items[i::sessions])):
+                run_steamcmd([exe, "+runscript", path],
+                             on_event=on_event and (lambda event: on_event(i, event)),
+                             staging=install_dir or os.path.dirname(exe),
+                             cancel=cancel)
+        finally:
+            os.remove(path)
+
+    if sessions == 1:
+        run(0)
+    else:
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            list(pool.map(run, range(sessions)))
+
+def workshop_content_dir(install_dir=None):
+    """Where run_steamcmd_batch leaves Starbound workshop items."""
+    root = install_dir or os.path.join(os.getcwd(), "steamcmd")
+    return os.path.join(root, "steamapps", "workshop", "content", STARBOUND_APP_ID)
+
+class PollingWatcher:
+    """
+    Portable watcher: wait() re-scans a few times a second and reports
+    whether anything was added, removed or changed. The path given to the
+    constructor is watched for its direct entries only; add() watches a
+    whole tree. Entries that vanish or can't be read are left out.
+    """
+    interval = 0.25
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def __init__(self, path):
+        self.roots = [(path, False)]
+        self.last  = self.snapshot()
+
+    def add(self, path):
+        self.roots.append((path, True))
+        self.last = self.snapshot()
+
+    def snapshot(self):
+        state = set()
+        for root, recursive in self.roots:
+            for top, dirs, files in os.walk(root):  # skips unreadable folders
+                for name in dirs + files:
+                    try:
+                        st = os.stat(os.path.join(top, name), follow_symlinks=False)
+                    except OSError:
+                        continue
+                    state.add((top, name, st.st_size, st.st_mtime_ns))
+                if not recursive:
+                    break
+        return frozenset(state)
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; True if anything changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self.snapshot()
+            if current != self.last:
+                self.last = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class InotifyWatcher(PollingWatcher):
+    """
+    Linux watcher on top of inotify; new subdirectories of add()ed trees
+    are followed.
+    """
+    IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+    IN_MOVED_FROM, IN_MOVED_TO           = 0x40, 0x80
+    IN_CREATE, IN_DELETE                 = 0x100, 0x200
+    IN_ISDIR                             = 0x40000000
+    IN_NONBLOCK, IN_CLOEXEC              = 0o4000, 0o2000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+            | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    @classmethod
+    def available(cls):
+        return sys.platform.startswith("linux")
+
+    def __init__(self, path):
+        import ctypes
+
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        self.watch(path)
+
+    def watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self.dirs[wd] = path
+
+    def add(self, path):
+        """Watch path and everything below it."""
+        self.watch(path)
+        for root, dirs, _ in os.walk(path):
+            for d in dirs:
+                self.watch(os.path.join(root, d))
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return False
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            offset += 16
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_CREATE and mask & self.IN_ISDIR and wd in self.dirs:
+                self.add(os.path.join(self.dirs[wd], os.fsdecode(name)))
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+# First available backend wins; add e.g. a ReadDirectoryChangesW one in front
+WATCHER_BACKENDS = [InotifyWatcher, PollingWatcher]
+
+def make_watcher(path):
+    for backend in WATCHER_BACKENDS:
+        if backend.available():
+            try:
+                return backend(path)
+            except OSError:
+                continue
+    return PollingWatcher(path)
+
+def wait_for_output(path, proc=None, timeout=INSTALLER_TIMEOUT, quiet=INSTALLER_QUIET,
+                    cancel=None):
+    """
+    Wait until an installer has finished producing the directory at path.
+    With the installer's process handle, waiting for it to exit is enough.
+    Without one (or if the tree isn't there when it exits), fall back to a
+    watcher: wait for path to appear, then until nothing under it has been
+    written for quiet seconds. Raises TimeoutError after timeout seconds,
+    Cancelled as soon as cancel is set (the installer is left running).
+    """
+    deadline = time.monotonic() + timeout
+    if proc is not None:
+        while True:
+            check_cancelled(cancel)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Installer still running after {timeout}s")
+            try:
+                code = proc.wait(timeout=min(remaining, 1.0))
+                break
+            except subprocess.TimeoutExpired:
+                pass
+        if code != 0:
+            raise subprocess.CalledProcessError(code, proc.args)
+        if os.path.isdir(path):
+            return
+
+    # Only the parent's own entries until path appears: a parent such as
+    # C:\Program Files is far too big (and partly unreadable) to scan
+    parent = os.path.dirname(os.path.normpath(path))
+    with make_watcher(parent) as watcher:
+        while not os.path.isdir(path):
+            check_cancelled(cancel)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{path} did not appear within {timeout}s")
+            watcher.wait(min(remaining, 1.0))
+    with make_watcher(path) as watcher:
+        watcher.add(path)
+        while watcher.wait(quiet):
+            check_cancelled(cancel)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{path} still changing after {timeout}s")
+
+AssetDeployment = namedtuple("AssetDeployment", "strategy files removed bytes_saved")
+
+def reflink_file(src, dst):
+    """Clone src to dst sharing its data blocks (Btrfs/XFS FICLONE)."""
+    import fcntl
+
+    tmp = f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def hardlink_file(src, dst):
+    """Hardlink src at dst, replacing whatever is there atomically."""
+    tmp = f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+    os.link(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def write_sbinit(path, add=(), drop=()):
+    """
+    Update OpenStarbound's sbinit.config so the asset directories in add come
+    first and those in drop are gone, keeping every other setting already in
+    the file. A missing file is only created when there is something to add.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        if not add:
+            return
+        config = {}
+
+    def key(d):
+        return os.path.normcase(os.path.normpath(d))
+
+    existing = config.get("assetDirectories") or [
+        os.path.join("..", "assets", ""), os.path.join("..", "mods", "")
+    ]
+    wanted  = [os.path.join(d, "") for d in add]
+    skipped = {key(d) for d in list(add) + list(drop)}
+    updated = wanted + [d for d in existing if key(d) not in skipped]
+    if updated == config.get("assetDirectories"):
+        return
+    config["assetDirectories"] = updated
+    config.setdefault("storageDirectory", os.path.join("..", "storage", ""))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json_atomic(path, config)
+
+def can_link(link, src, dst):
+    """Try link() on one file from src into dst to see if the volume allows it."""
+    first = next(iter_files(src), None)
+    if first is None:
+        return False
+    os.makedirs(dst, exist_ok=True)
+    probe = os.path.join(dst, ".osb_link_probe")
+    try:
+        link(first[1].path, probe)
+    except OSError:
+        return False
+    os.remove(probe)
+    return True
+
+def tree_size(root):
+    return sum(entry.stat().st_size for _, entry in iter_files(root))
+
+def deploy_assets(src, dst, sbinit_path, mode="auto"):
+    """
+    Put the Steam assets at src in front of OpenStarbound, trying the
+    cheapest strategy first: reflink, then hardlink (same volume only), then
+    pointing sbinit.config at src, then copying. An explicit mode starts the
+    chain at that strategy. Linked and copied files are tracked with the
+    sync manifest, so re-runs only touch what changed.
+    Returns an AssetDeployment saying what was used and how many bytes did
+    not have to be copied.
+    """
+    manifest = dst + ".manifest.json"
+    chain = list(ASSET_MODES[1:])
+    if mode != "auto":
+        chain = chain[chain.index(mode):]
+
+    for strategy in chain:
+        if strategy == "sbinit":
+            # Drop any copies a previous sync left, the game reads src directly
+            removed = remove_synced(dst, load_manifest(manifest))
+            if os.path.exists(manifest):
+                os.remove(manifest)
+            write_sbinit(sbinit_path, add=[src])
+            return AssetDeployment(strategy, 0, removed, tree_size(src))
+
+        # The other strategies put files in dst, so src must not be listed too
+        write_sbinit(sbinit_path, drop=[src])
+        if strategy == "copy":
+            files, removed = sync_tree(src, dst, manifest, inodes="separate")
+            return AssetDeployment(strategy, files, removed, 0)
+
+        if strategy == "reflink":
+            if not sys.platform.startswith("linux"):
+                continue
+            link, inodes = reflink_file, "separate"
+        else:
+            link, inodes = hardlink_file, "shared"
+        if not can_link(link, src, dst):
+            continue
+        try:
+            files, removed = sync_tree(src, dst, manifest, copy=link, inodes=inodes)
+        except OSError:
+            continue  # filesystem gave up part way, try the next strategy
+        return AssetDeployment(strategy, files, removed, tree_size(src))
+
+ZipMember = namedtuple("ZipMember", "name method crc csize size offset end")
+
+def http_range(url, start=None, end=None, suffix=None):
+    """
+    Open a Range request for bytes start..end (inclusive) or the last suffix
+    bytes of url. Raises ValueError if the server doesn't honour ranges.
+    """
+    if suffix is not None:
+        headers = {"Range": f"bytes=-{suffix}"}
+    else:
+        headers = {"Range": f"bytes={start}-{'' if end is None else end}"}
+    resp = HTTP.open(url, headers=headers)
+    if resp.status != 206:
+        resp.close()
+        raise ValueError(f"Server does not support range requests: {url}")
+    return resp
+
+def read_remote_zip_index(url):
+    """
+    Read only the central directory of the zip at url (EOCD from the tail,
+    then the directory itself if the tail didn't cover it). Returns the
+    members sorted by offset; each one's end is where the next one starts.
+    """
+    with http_range(url, suffix=ZIP_TAIL_SIZE) as resp:
+        tail = resp.read()
+        archive_size = int(resp.headers["Content-Range"].rsplit("/", 1)[1])
+    tail_start = archive_size - len(tail)
+
+    pos = tail.rfind(b"PK\x05\x06")
+    if pos < 0:
+        raise ValueError("Zip end-of-central-directory record not found")
+    count, cd_size, cd_offset = struct.unpack_from("<10xHII", tail, pos)
+    if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+        # Zip64: the locator right before the EOCD points at the real record;
+        # a long archive comment can push either one out of the tail
+        def read_at(offset, size):
+            if offset >= tail_start:
+                return tail[offset - tail_start:offset - tail_start + size]
+            with http_range(url, offset, offset + size - 1) as resp:
+                return resp.read()
+
+        loc = read_at(tail_start + pos - 20, 20) if tail_start + pos >= 20 else b""
+        if len(loc) < 20 or loc[:4] != b"PK\x06\x07":
+            raise ValueError("Zip64 end-of-central-directory locator not found")
+        (rec_offset,) = struct.unpack_from("<8xQ", loc)
+        rec = read_at(rec_offset, 56)
+        if len(rec) < 56 or rec[:4] != b"PK\x06\x06":
+            raise ValueError("Zip64 end-of-central-directory record not found")
+        count, cd_size, cd_offset = struct.unpack_from("<32xQQQ", rec)
+
+    if cd_offset >= tail_start:
+        cd = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+    else:
+        with http_range(url, cd_offset, cd_offset + cd_size - 1) as resp:
+            cd = resp.read()
+
+    members = []
+    pos = 0
+    for _ in range(count):
+        (sig, flags, method, crc, csize, size, name_len, extra_len,
+         comment_len, offset) = struct.unpack_from("<4s4xHH4xIIIHHH8xI", cd, pos)
+        if sig != b"PK\x01\x02":
+            raise ValueError("Corrupt zip central directory")
+        name = cd[pos + 46:pos + 46 + name_len]
+        name = name.decode("utf-8" if flags & 0x800 else "cp437")
+        extra = cd[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+        # Zip64 extra field holds whichever values overflowed, in order
+        i = 0
+        while i + 4 <= len(extra):
+            tag, length = struct.unpack_from("<HH", extra, i)
+            if tag == 0x0001:
+                values = list(struct.unpack_from(f"<{length // 8}Q", extra, i + 4))
+                if size == 0xFFFFFFFF:
+                    size = values.pop(0)
+                if csize == 0xFFFFFFFF:
+                    csize = values.pop(0)
+                if offset == 0xFFFFFFFF:
+                    offset = values.pop(0)
+            i += 4 + length
+        members.append([name, method, crc, csize, size, offset])
+        pos += 46 + name_len + extra_len + comment_len
+
+    members.sort(key=lambda m: m[5])
+    ends = [m[5] for m in members[1:]] + [cd_offset]
+    return [ZipMember(*m, end) for m, end in zip(members, ends)]
+
+def file_crc32(path):
+    import zlib
+
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+def extract_member_stream(resp, member, target):
+    """
+    Read one member (local header + data) from resp, which must be positioned
+    at its local header, and write it atomically to target, checking CRC.
+    """
+    import zlib
+
+    header = resp.read(30)
+    if header[:4] != b"PK\x03\x04":
+        raise ValueError(f"Bad local header for {member.name}")
+    name_len, extra_len = struct.unpack_from("<HH", header, 26)
+    resp.read(name_len + extra_len)
+
+    if member.method == 8:
+        decomp = zlib.decompressobj(-15)
+    elif member.method != 0:
+        raise ValueError(f"Unsupported compression method {member.method} for {member.name}")
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    crc = 0
+    remaining = member.csize
+    with open(tmp, "wb") as f:
+        while remaining:
+            chunk = resp.read(min(remaining, DOWNLOAD_CHUNK_SIZE))
+            if not chunk:
+                raise ValueError(f"Truncated data for {member.name}")
+            remaining -= len(chunk)
+            if member.method == 8:
+                chunk = decomp.decompress(chunk)
+            crc = zlib.crc32(chunk, crc)
+            f.write(chunk)
+        if member.method == 8:
+            tail = decomp.flush()
+            crc = zlib.crc32(tail, crc)
+            f.write(tail)
+    if crc != member.crc:
+        os.remove(tmp)
+        raise ValueError(f"CRC mismatch for {member.name}")
+    os.replace(tmp, target)
+    # Skip the data descriptor / padding up to the next member
+    resp.read(member.end - member.offset - 30 - name_len - extra_len - member.csize)
+
+def update_from_zip(url, dest, progress=None):
+    """
+    Bring dest up to date with the zip at url, downloading only the members
+    whose CRC32 or size differ from the installed files. A single top-level
+    folder in the archive is stripped. Local CRCs are cached in
+    dest/.osb_update.json keyed by size and mtime. If any member would land
+    outside dest, ValueError is raised before anything is written.
+    Returns (changed, total, bytes_fetched).
+    """
+    members = [m for m in read_remote_zip_index(url) if not m.name.endswith("/")]
+    tops = {m.name.split("/", 1)[0] for m in members}
+    strip = ""
+    if len(tops) == 1 and all("/" in m.name for m in members):
+        strip = tops.pop() + "/"
+    targets = {m.name: safe_member_path(dest, m.name[len(strip):]) for m in members}
+
+    cache_path = os.path.join(dest, ".osb_update.json")
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            crc_cache = json.load(f)
+    except (OSError, ValueError):
+        crc_cache = {}
+
+    changed = []
+    for m in members:
+        rel = m.name[len(strip):]
+        target = targets[m.name]
+        try:
+            st = os.stat(target)
+        except OSError:
+            changed.append((m, target))
+            continue
+        cached = crc_cache.get(rel)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            crc = cached[2]
+        else:
+            crc = file_crc32(target)
+            crc_cache[rel] = [st.st_size, st.st_mtime_ns, crc]
+        if st.st_size != m.size or crc != m.crc:
+            changed.append((m, target))
+
+    # Coalesce members that sit next to each other into one range request
+    with TRACE.span("delta_update", url=url) as span:
+        fetched = 0
+        i = 0
+        while i < len(changed):
+            j = i
+            while j + 1 < len(changed) and changed[j + 1][0].offset == changed[j][0].end:
+                j += 1
+            start, end = changed[i][0].offset, changed[j][0].end - 1
+            with http_range(url, start, end) as resp:
+                for m, target in changed[i:j + 1]:
+                    extract_member_stream(resp, m, target)
+                    st = os.stat(target)
+                    crc_cache[m.name[len(strip):]] = [st.st_size, st.st_mtime_ns, m.crc]
+            fetched += end - start + 1
+            span.add(bytes_read=end - start + 1, files=j + 1 - i)
+            if progress:
+                progress(j + 1, len(changed))
+            i = j + 1
+
+    os.makedirs(dest, exist_ok=True)
+    write_json_atomic(cache_path, crc_cache)
+    return len(changed), len(members), fetched
+
+def safe_member_path(dest, name):
+    """Resolve a zip member name under dest, refusing anything that escapes it."""
+    if name.startswith(("/", "\\")) or re.match(r"^[A-Za-z]:", name):
+        raise ValueError(f"Absolute path in archive: {name}")
+    target = os.path.normpath(os.path.join(dest, *re.split(r"[/\\]", name)))
+    root = os.path.normpath(dest)
+    if os.path.commonpath([os.path.normcase(root), os.path.normcase(target)]) \
+            != os.path.normcase(root):
+        raise ValueError(f"Path escapes the target folder: {name}")
+    return target
+
+def extract_archive(path, dest, max_workers=EXTRACT_WORKERS, progress=None):
+    """
+    Extract the zip at path into dest on a thread pool. Every worker opens its
+    own handle on the archive, members are handed out largest first so one
+    big file doesn't end up last, and all directories are created up front.
+    zipfile checks each member's CRC as it streams, and names that would
+    land outside dest are rejected before anything is written. Unix
+    executable bits stored in the archive are kept.
+    progress(name, done, total) is called after each member.
+    Returns the number of files extracted.
+    """
+    import zipfile
+
+    with zipfile.ZipFile(path) as z:
+        infos = z.infolist()
+
+    files = []
+    dirs = {os.path.normpath(dest)}
+    for info in infos:
+        target = safe_member_path(dest, info.filename)
+        if info.is_dir():
+            dirs.add(target)
+        else:
+            dirs.add(os.path.dirname(target))
+            files.append((info, target))
+    for d in sorted(dirs):
+        os.makedirs(d, exist_ok=True)
+    files.sort(key=lambda f: f[0].file_size, reverse=True)
+
+    local = threading.local()
+    lock = threading.Lock()
+    handles = []
+    counter = {"done": 0}
+
+    def extract_one(job):
+        info, target = job
+        if not hasattr(local, "zip"):
+            local.zip = zipfile.ZipFile(path)
+            with lock:
+                handles.append(local.zip)
+        try:
+            with local.zip.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+        except BaseException:
+            # Don't leave a member behind that failed its CRC check half way
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
+        mode = info.external_attr >> 16
+        if os.name == "posix" and mode & 0o111:
+            os.chmod(target, mode & 0o777)  # keep executables runnable
+        if progress:
+            with lock:
+                counter["done"] += 1
+                done = counter["done"]
+            progress(info.filename, done, len(files))
+
+    try:
+        with TRACE.span("extract", archive=path, workers=max_workers) as span:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for _ in pool.map(extract_one, files):
+                    pass
+            span.add(bytes_read=sum(info.compress_size for info, _ in files),
+                     bytes_written=sum(info.file_size for info, _ in files),
+                     files=len(files))
+    finally:
+        for handle in handles:
+            handle.close()
+    return len(files)
+
+class InstallJournal:
+    """
+    Persistent record of completed install steps and the inputs they ran
+    with. A step whose recorded inputs match the current ones can be skipped
+    on the next run. Entries are rewritten atomically after every change.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def normalize(inputs):
+        # Tuples and lists must compare equal after a round trip
+        return json.loads(json.dumps(inputs, sort_keys=True))
+
+    def is_current(self, name, inputs):
+        with self.lock:
+            entry = self.entries.get(name)
+        return bool(entry) and entry["inputs"] == self.normalize(inputs)
+
+    def record(self, name, inputs):
+        with self.lock:
+            self.entries[name] = {"inputs": self.normalize(inputs),
+                                  "finished": time.time()}
+            write_json_atomic(self.path, self.entries)
+
+    def invalidate(self, name):
+        with self.lock:
+            if self.entries.pop(name, None) is not None:
+                write_json_atomic(self.path, self.entries)
+
+def resolve_latest_tag():
+    """Follow GitHub's /releases/latest redirect to a tag like v0.1.14."""
+    with HTTP.open(OSB_LATEST_URL, method="HEAD") as resp:
+        final_url = resp.geturl()
+
+    match = re.search(r"/tag/(v[\d\.]+)$", final_url)
+    if not match:
+        raise ValueError(f"Could not extract release tag from: {final_url}")
+    return match.group(1)
+
+class SteamWebApiProvider:
+    """Workshop metadata from the public Steam Web API (no key needed)."""
+    batch = 100
+
+    def post(self, method, count_field, ids):
+        from urllib.parse import urlencode
+        from urllib.request import urlopen
+
+        form = {count_field: len(ids)}
+        for i, item in enumerate(ids):
+            form[f"publishedfileids[{i}]"] = item
+        with urlopen(f"{STEAM_API_URL}/{method}/v1/",
+                     data=urlencode(form).encode(),
+                     timeout=DOWNLOAD_TIMEOUT) as resp:
+            reply = json.load(resp)
+        if not isinstance(reply, dict) or not isinstance(reply.get("response"), dict):
+            raise ValueError(f"Unexpected reply from {method}")
+        return reply["response"]
+
+    def collection_children(self, ids):
+        """{collection id: [child ids]} for those of ids that are collections."""
+        result = {}
+        for i in range(0, len(ids), self.batch):
+            resp = self.post("GetCollectionDetails", "collectioncount", ids[i:i + self.batch])
+            for entry in resp.get("collectiondetails", []):
+                children = entry.get("children")
+                if entry.get("result") == 1 and children:
+                    result[str(entry["publishedfileid"])] = [
+                        str(c["publishedfileid"])
+                        for c in sorted(children, key=lambda c: c.get("sortorder", 0))
+                    ]
+        return result
+
+    def item_details(self, ids):
+        """{item id: {'time_updated': int, 'file_size': int}}."""
+        result = {}
+        for i in range(0, len(ids), self.batch):
+            resp = self.post("GetPublishedFileDetails", "itemcount", ids[i:i + self.batch])
+            for entry in resp.get("publishedfiledetails", []):
+                if entry.get("result") == 1:
+                    result[str(entry["publishedfileid"])] = {
+                        "time_updated": int(entry.get("time_updated", 0)),
+                        "file_size": int(entry.get("file_size", 0)),
+                    }
+        return result
+
+class JsonFileProvider:
+    """
+    Workshop metadata from a local JSON file shaped like
+    {"collections": {id: [child ids]}, "items": {id: {"time_updated": ..,
+    "file_size": ..}}}. Stands in for the Web API in tests and benchmarks.
+    """
+
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.collections = data.get("collections", {})
+        self.items = data.get("items", {})
+
+    def collection_children(self, ids):
+        return {i: list(self.collections[i]) for i in ids if i in self.collections}
+
+    def item_details(self, ids):
+        return {i: dict(self.items[i]) for i in ids if i in self.items}
+
+def make_workshop_provider():
+    """OSB_WORKSHOP_JSON points at a local stand-in, otherwise use the Web API."""
+    path = os.environ.get("OSB_WORKSHOP_JSON")
+    return JsonFileProvider(path) if path else SteamWebApiProvider()
+
+def resolve_workshop_items(ids, provider):
+    """Expand (nested) collections into their item IDs, deduped, in order."""
+    items = []
+    seen = set()
+    pending = [str(i) for i in ids]
+    while pending:
+        level = [i for i in dict.fromkeys(pending) if i not in seen]
+        seen.update(level)
+        children = provider.collection_children(level) if level else {}
+        pending = []
+        for i in level:
+            if i in children:
+                pending.extend(children[i])
+            else:
+                items.append(i)
+    return list(dict.fromkeys(items))
+
+class WorkshopIndex:
+    """
+    Local record of every downloaded workshop item: its time_updated, size
+    and where SteamCMD put it. outdated() lists what actually needs work.
+    """
+
+    def __init__(self, path=WORKSHOP_INDEX_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.items = json.load(f)
+        except (OSError, ValueError):
+            self.items = {}
+
+    def outdated(self, details):
+        """Item IDs that are new, updated upstream or missing on disk."""
+        todo = []
+        for item, info in details.items():
+            known = self.items.get(item)
+            if not known or info["time_updated"] is None \
+                    or known["time_updated"] != info["time_updated"] \
+                    or not os.path.isdir(known["path"]):
+                todo.append(item)
+        return todo
+
+    def record(self, details, content_dir):
+        for item, info in details.items():
+            self.items[item] = dict(info, path=os.path.join(content_dir, item))
+        write_json_atomic(self.path, self.items)
+
+def write_vlqu(out, value):
+    """Starbound's unsigned VLQ: 7-bit groups, most significant first."""
+    groups = [value & 0x7F]
+    value >>= 7
+    while value:
+        groups.append(0x80 | (value & 0x7F))
+        value >>= 7
+    out += bytes(reversed(groups))
+
+def read_vlqu(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+def write_sb_string(out, text):
+    raw = text.encode("utf-8")
+    write_vlqu(out, len(raw))
+    out += raw
+
+def read_sb_string(data, pos):
+    length, pos = read_vlqu(data, pos)
+    return data[pos:pos + length].decode("utf-8"), pos + length
+
+def write_sb_json(out, value):
+    """Starbound's binary Json encoding (type byte + payload)."""
+    if value is None:
+        out.append(1)
+    elif isinstance(value, bool):
+        out += bytes((3, value))
+    elif isinstance(value, int):
+        out.append(4)
+        write_vlqu(out, (-(value + 1) << 1) | 1 if value < 0 else value << 1)
+    elif isinstance(value, float):
+        out.append(2)
+        out += struct.pack(">d", value)
+    elif isinstance(value, str):
+        out.append(5)
+        write_sb_string(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(6)
+        write_vlqu(out, len(value))
+        for item in value:
+            write_sb_json(out, item)
+    elif isinstance(value, dict):
+        out.append(7)
+        write_vlqu(out, len(value))
+        for key, item in value.items():
+            write_sb_string(out, key)
+            write_sb_json(out, item)
+    else:
+        raise TypeError(f"Can't encode {type(value).__name__} as Starbound Json")
+
+def read_sb_json(data, pos):
+    kind = data[pos]
+    pos += 1
+    if kind == 1:
+        return None, pos
+    if kind == 2:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    if kind == 3:
+        return bool(data[pos]), pos + 1
+    if kind == 4:
+        raw, pos = read_vlqu(data, pos)
+        return (-(raw >> 1) - 1 if raw & 1 else raw >> 1), pos
+    if kind == 5:
+        return read_sb_string(data, pos)
+    if kind == 6:
+        count, pos = read_vlqu(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = read_sb_json(data, pos)
+            items.append(item)
+        return items, pos
+    if kind == 7:
+        count, pos = read_vlqu(data, pos)
+        obj = {}
+        for _ in range(count):
+            key, pos = read_sb_string(data, pos)
+            obj[key], pos = read_sb_json(data, pos)
+        return obj, pos
+    raise ValueError(f"Unknown Starbound Json type {kind}")
+
+def pack_directory(src, dest):
+    """
+    Pack a loose mod folder into a Starbound SBAsset6 .pak at dest.
+    '_metadata' / '.metadata' becomes the pak metadata, like the game's own
+    asset_packer. File data is written through a memory map of the
+    preallocated output and the index is collected in the same pass; the
+    pak is renamed into place once complete. Returns the number of assets.
+    """
+    import mmap
+
+    metadata = {}
+    files = []
+    for rel, entry in iter_files(src):
+        if rel in ("_metadata", ".metadata"):
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    metadata = json.load(f)
+            except ValueError:
+                pass  # commented metadata, the game copes without it
+            continue
+        files.append(("/" + rel, entry.path, entry.stat().st_size))
+
+    data_size = sum(size for _, _, size in files)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    index = []
+    try:
+        with open(tmp, "w+b") as out:
+            out.truncate(16 + data_size)
+            pos = 16
+            mm = mmap.mmap(out.fileno(), 16 + data_size) if data_size else None
+            try:
+                for path, full, size in files:
+                    with open(full, "rb") as f:
+                        view = memoryview(mm)[pos:pos + size] if size else None
+                        read = f.readinto(view) if size else 0
+                        if view is not None:
+                            view.release()
+                    if read != size:
+                        raise ValueError(f"{full} changed while packing")
+                    index.append((path, pos, size))
+                    pos += size
+            finally:
+                if mm is not None:
+                    mm.close()
+
+            tail = bytearray(b"INDEX")
+            write_sb_json(tail, metadata)
+            tail.pop(5)  # the metadata map is written without the type byte
+            write_vlqu(tail, len(index))
+            for path, offset, size in index:
+                write_sb_string(tail, path)
+                tail += struct.pack(">QQ", offset, size)
+            out.seek(0)
+            out.write(b"SBAsset6" + struct.pack(">Q", 16 + data_size))
+            out.seek(16 + data_size)
+            out.write(tail)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return len(index)
+
+def read_pak(path):
+    """Return (metadata, {asset path: (offset, size)}) for an SBAsset6 pak."""
+    with open(path, "rb") as f:
+        header = f.read(16)
+        if header[:8] != b"SBAsset6":
+            raise ValueError(f"{path} is not an SBAsset6 pak")
+        (index_start,) = struct.unpack(">Q", header[8:])
+        f.seek(index_start)
+        data = f.read()
+    if data[:5] != b"INDEX":
+        raise ValueError(f"{path} has no index")
+    count, pos = read_vlqu(data, 5)
+    metadata = {}
+    for _ in range(count):
+        key, pos = read_sb_string(data, pos)
+        metadata[key], pos = read_sb_json(data, pos)
+    count, pos = read_vlqu(data, pos)
+    index = {}
+    for _ in range(count):
+        name, pos = read_sb_string(data, pos)
+        index[name] = struct.unpack_from(">QQ", data, pos)
+        pos += 16
+    return metadata, index
+
+def read_pak_asset(path, entry):
+    offset, size = entry
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+def deploy_mod(item_dir, mods_dir, name):
+    """
+    Put one workshop item into mods_dir as <name>.pak: items that already
+    ship a .pak are hardlinked (copied across volumes), loose folders are
+    packed. Skips items whose pak is newer than every source file.
+    Returns 'linked', 'packed' or 'unchanged'.
+    """
+    target = os.path.join(mods_dir, name + ".pak")
+    sources = list(iter_files(item_dir))
+    paks = [entry.path for rel, entry in sources if rel.endswith(".pak")]
+    newest = max((entry.stat().st_mtime_ns for _, entry in sources), default=0)
+    try:
+        if os.stat(target).st_mtime_ns >= newest:
+            return "unchanged"
+    except OSError:
+        pass
+
+    if paks:
+        try:
+            hardlink_file(paks[0], target)
+        except OSError:
+            copy_file_atomic(paks[0], target)
+        return "linked"
+    with TRACE.span("pack", item=name) as span:
+        span.add(files=pack_directory(item_dir, target),
+                 bytes_written=os.path.getsize(target))
+    return "packed"
+
+class HashCache:
+    """
+    File digests keyed by (path, size, mtime, inode), persisted to disk, so
+    a file is only read again once it actually changed. Misses are hashed
+    in parallel on a thread pool (hashlib releases the GIL on big chunks).
+    """
+
+    def __init__(self, path=HASH_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(st):
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def hash_many(self, paths, max_workers=HASH_WORKERS):
+        """Return {path: digest}; missing files map to None."""
+        result = {}
+        misses = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                result[path] = None
+                continue
+            with self.lock:
+                cached = self.entries.get(os.path.abspath(path))
+            if cached and cached[:3] == self.key(st):
+                result[path] = cached[3]
+            else:
+                misses.append((path, st))
+
+        def hash_one(job):
+            path, st = job
+            return path, self.key(st) + [hash_file(path)]
+
+        if misses:
+            with TRACE.span("hash") as span, \
+                    ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for path, entry in pool.map(hash_one, misses):
+                    result[path] = entry[3]
+                    with self.lock:
+                        self.entries[os.path.abspath(path)] = entry
+                        self.dirty = True
+                span.add(bytes_read=sum(st.st_size for _, st in misses),
+                         files=len(misses))
+        return result
+
+    def hash_tree(self, root, skip=None):
+        """{relative path: digest} for every file under root not skipped."""
+        rels = {entry.path: rel for rel, entry in iter_files(root, skip=skip)}
+        return {rels[p]: d for p, d in self.hash_many(list(rels)).items()}
+
+    def save(self):
+        with self.lock:
+            if self.dirty:
+                write_json_atomic(self.path, self.entries)
+                self.dirty = False
+
+def verify_tree(root, expected, cache):
+    """Relative paths under root that are missing or differ from expected."""
+    paths = {os.path.join(root, *rel.split("/")): rel for rel in expected}
+    actual = cache.hash_many(list(paths))
+    return sorted(paths[p] for p, d in actual.items() if d != expected[paths[p]])
+
+def verify_copies(pairs, cache):
+    """(src, dst) pairs whose destination doesn't match its source."""
+    digests = cache.hash_many([p for pair in pairs for p in pair])
+    return [(src, dst) for src, dst in pairs if digests[src] != digests[dst]]
+
+def baseline_skip(rel):
+    return rel.split("/", 1)[0] in BASELINE_SKIP
+
+def load_baseline(root):
+    """The digests recorded for root after its last full validate, or None."""
+    try:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            return json.load(f).get(os.path.normcase(os.path.abspath(root)))
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(root, digests):
+    try:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    baselines[os.path.normcase(os.path.abspath(root))] = digests
+    write_json_atomic(BASELINE_PATH, baselines)
+
+def replicate_install(src, dst):
+    """
+    Provision dst from the finished OpenStarbound install at src. Files
+    share src's data where the volume allows (reflink, then hardlink) and
+    are copied otherwise. Every writer here replaces files instead of
+    editing them, so shared files never change under another install.
+    The game's own per-install folders (FLEET_PRIVATE) are left alone.
+    Returns (copied, removed) like sync_tree.
+    """
+    link = copy_file_atomic
+    candidates = [hardlink_file]
+    if sys.platform.startswith("linux"):
+        candidates.insert(0, reflink_file)
+    for candidate in candidates:
+        if can_link(candidate, src, dst):
+            link = candidate
+            break
+
+    def skip(rel):
+        return rel == FLEET_MANIFEST or rel.split("/", 1)[0] in FLEET_PRIVATE
+
+    return sync_tree(src, dst, os.path.join(dst, FLEET_MANIFEST), copy=link, skip=skip)
+
+class InstallEngine:
+    """
+    The install pipeline without any UI: paths and options are plain values
+    and progress is reported through callbacks, which are called from worker
+    threads. log(text) gets each log line, progress(value) the number of
+    finished steps plus the fraction of running downloads, status(text) a
+    live line such as SteamCMD's speed and ETA, and on_steam() runs once
+    Steam is up. The wizard and the command line both drive one.
+    With several osb_dirs the first is installed normally and the rest are
+    provisioned from it afterwards ("fleet" mode), so every download,
+    extraction and installer run happens once.
+    """
+
+    def __init__(self, steam_dir="", install_dir="", osb_dirs=(), asset_mode="auto",
+                 update_only=False, force=(), steam_client=True,
+                 log=print, progress=None, status=None, on_steam=None):
+        self.steam_dir    = steam_dir
+        self.install_dir  = install_dir
+        self.osb_dirs     = list(osb_dirs) or [os.path.join(os.getcwd(), "OpenStarbound")]
+        self.osb_dir      = self.osb_dirs[0]
+        self.asset_mode   = asset_mode
+        self.update_only  = update_only
+        self.force        = set(force)
+        self.steam_client = steam_client
+        self.log          = log
+        self.progress     = progress
+        self.status       = status
+        self.on_steam     = on_steam
+        self.status_logged = 0.0
+
+        self.steps_done = 0
+        self.partial    = {}
+        self.cancel     = threading.Event()
+        self.lock       = threading.Lock()
+        self.cache      = DownloadCache()
+        self.workshop_dir = workshop_content_dir()
+        self.installer_proc = None
+        self.osb_tag    = None
+        self.mods       = None
+        self.journal    = InstallJournal()
+        self.hashes     = HashCache()
+        self.ran        = set()
+
+    def log_write(self, txt):
+        self.log(txt)
+
+    def update_progress(self):
+        """Completed steps plus the fraction of any running downloads."""
+        if self.progress:
+            self.progress(self.steps_done + sum(self.partial.values()))
+
+    def steamcmd_event(self, session, event):
+        """Show SteamCMD progress on the bar and status line; log the milestones."""
+        if event.kind == "progress":
+            if event.total:
+                self.partial[f"steamcmd{session}"] = event.done / event.total
+                self.update_progress()
+            text = (f"SteamCMD {event.state}: {event.done / 1024 ** 2:.0f} of "
+                    f"{event.total / 1024 ** 2:.0f} MB")
+            if event.rate:
+                text += f", {event.rate / 1024 ** 2:.1f} MB/s"
+            if event.eta is not None:
+                text += f", {format_eta(event.eta)} left"
+            if self.status:
+                self.status(text)
+            now = time.monotonic()
+            if now - self.status_logged >= STEAMCMD_LOG_INTERVAL:
+                self.status_logged = now
+                self.log_write(f"  → {text}")
+        elif event.kind == "item_done":
+            self.log_write(f"  → Workshop item {event.item} downloaded "
+                           f"({event.done / 1024 ** 2:.1f} MB)")
+        elif event.kind == "item_failed":
+            self.log_write(f"⚠ Workshop item {event.item} failed: {event.state}")
+        elif event.kind == "app_failed":
+            self.log_write(f"⚠ SteamCMD left app {event.item} in state {event.state}")
+        elif event.kind == "retry":
+            self.partial.pop(f"steamcmd{session}", None)
+            self.log_write(f"⚠ SteamCMD stalled, restarting it "
+                           f"(retry {event.done} of {event.total})")
+
+    def fetch(self, url):
+        """
+        Return a local path for url from the download cache, showing byte
+        progress on the progress bar while it downloads.
+        """
+        def report(done, total):
+            if total:
+                self.partial[url] = done / total
+                self.update_progress()
+
+        try:
+            return self.cache.fetch(url, progress=report, cancel=self.cancel)
+        finally:
+            self.partial.pop(url, None)
+            self.update_progress()
+
+    def steps(self):
+        """
+        The step graph for this run as (name, description, function,
+        prerequisites).
+        """
+        if self.update_only:
+            steps = [("update", "Update OSB from nightly build",
+                      self._step_update_nightly, ())]
+        else:
+            steps = [
+                ("steam", "Ensure Steam is running",
+                 self._step_steam, ()),
+                ("minimize", "Minimize Steam window",
+                 minimize_steam_window, ("steam",)),
+                ("steamcmd", "Download SteamCMD",
+                 self._step_steamcmd, ()),
+                ("starbound", "Install Starbound and mods",
+                 self._step_starbound, ("steamcmd",)),
+                ("installer", "Download and run OSB installer",
+                 self._step_installer_release, ()),
+                ("merge", "Move OSB files to install folder",
+                 self._step_merge_osb_output, ("installer",)),
+                # assets/ also receives OSB's own paks from the merge
+                ("assets", "Copy Steam assets",
+                 self._step_assets, ("starbound", "merge")),
+                ("deploy", "Deploy mods",
+                 self._step_deploy_mods, ("starbound", "merge")),
+                ("final", "Final OSB file copy & cleanup",
+                 self._step_final_osb_copy, ("minimize", "assets", "deploy")),
+            ]
+            if not self.steam_client:
+                client = {"steam", "minimize"}
+                steps = [(name, desc, func, tuple(d for d in deps if d not in client))
+                         for name, desc, func, deps in steps if name not in client]
+        if len(self.osb_dirs) > 1:
+            steps.append(("fleet", f"Provision {len(self.osb_dirs) - 1} more OSB folder(s)",
+                          self._step_fleet, (steps[-1][0],)))
+        return steps
+
+    def run(self):
+        """Run every step; raises StepFailed if one of them fails."""
+        steps = self.steps()
+        self.steps_done = 0
+        self.osb_tag = None
+        self.mods = None
+        self.ran = set()
+        self.partial.clear()
+        self.cancel.clear()
+        steps = [(name, desc, self.journaled(name, func, deps), deps)
+                 for name, desc, func, deps in steps]
+
+        def on_start(name, desc):
+            self.log_write(f"→ {desc}…")
+
+        def on_done(name, desc, error):
+            if error is not None:
+                self.log_write(f"✘ {desc}: {error}")
+                return
+            self.log_write(f"✔ {desc}")
+            with self.lock:
+                self.steps_done += 1
+            self.update_progress()
+
+        try:
+            run_step_graph(steps, on_start=on_start, on_done=on_done,
+                           cancel=self.cancel)
+        finally:
+            trace = TRACE.save()
+            if trace:
+                self.log_write(f"→ Trace written to {trace}")
+
+    def step_inputs(self, name):
+        """
+        What a journaled step's result depends on, or None for steps that
+        always run. Output checks (e.g. 'exe') make a step re-run if its
+        result was deleted since.
+        """
+        osb_dir = self.osb_dir
+        steamcmd = os.path.join(os.getcwd(), "steamcmd", "steamcmd.exe")
+        if name == "steamcmd":
+            return {"url": STEAMCMD_URL, "exe": os.path.isfile(steamcmd)}
+        if name == "starbound":
+            sb_dir = self.steam_dir
+            details = self.mod_details()
+            return {"sb_dir": sb_dir, "mods": WORKSHOP_MOD_IDS,
+                    "versions": details and {i: d["time_updated"] for i, d in details.items()},
+                    "exe": os.path.isfile(os.path.join(sb_dir, "starbound.exe"))}
+        if name in ("installer", "merge"):
+            return {"tag": self.latest_tag(), "osb_dir": osb_dir,
+                    "exe": os.path.isfile(os.path.join(osb_dir, "win", "starbound.exe"))}
+        if name == "assets":
+            src = os.path.join(self.steam_dir, "assets")
+            manifest = json.dumps(build_manifest(src), sort_keys=True)
+            return {"source": hashlib.blake2b(manifest.encode(), digest_size=16).hexdigest(),
+                    "osb_dir": osb_dir, "mode": self.asset_mode}
+        return None
+
+    def forced(self, name):
+        """
+        Whether --force covers a step. Forcing a step also forces the ones
+        recorded together with it (JOURNAL_WITH), since it needs their output.
+        """
+        return bool({"all", name, JOURNAL_WITH.get(name)} & self.force)
+
+    def journaled(self, name, func, deps):
+        """
+        Wrap a step so it is skipped when the journal has it finished with
+        the same inputs and none of its prerequisites re-ran this time.
+        --force STEP (or --force all) always re-runs it.
+        """
+        def run():
+            inputs = None if self.forced(name) else self.step_inputs(name)
+            with self.lock:
+                upstream_ran = bool(self.ran & set(deps))
+            if inputs is not None and not upstream_ran \
+                    and self.journal.is_current(name, inputs):
+                self.log_write("  → Unchanged since the last run, skipping")
+                return
+
+            self.journal.invalidate(name)
+            func()
+            with self.lock:
+                self.ran.add(name)
+            # Record what the step left behind, e.g. the exe it installed
+            finished = [step for step, later in JOURNAL_WITH.items() if later == name]
+            if name not in JOURNAL_WITH:
+                finished.append(name)
+            for step in finished:
+                inputs = self.step_inputs(step)
+                if inputs is not None:
+                    self.journal.record(step, inputs)
+        return run
+
+    def _step_steam(self):
+        # Check if Steam.exe is running
+        out = subprocess.check_output(
+            ["tasklist", "/FI", "IMAGENAME eq Steam.exe"],
+            stderr=subprocess.DEVNULL, text=True
+        )
+        if "Steam.exe" not in out:
+            # Launch Steam
+            steam_root = ""
+            if winreg:
+                try:
+                    key = winreg.OpenKey(winreg.HKEY_CURRENT_USER,
+                                        r"Software\Valve\Steam")
+                    steam_root, _ = winreg.QueryValueEx(key, "SteamPath")
+                except Exception:
+                    pass
+            steam_exe = os.path.join(steam_root, "Steam.exe")
+            if os.path.isfile(steam_exe):
+                subprocess.Popen([steam_exe],
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+                # Brief pause to let Steam start
+                time.sleep(2)
+            else:
+                raise FileNotFoundError("Steam.exe not found.")
+        # Bring installer back to front
+        if self.on_steam:
+            self.on_steam()
+
+    def _step_steamcmd(self):
+        dest = os.path.join(os.getcwd(), "steamcmd")
+        exe  = os.path.join(dest, "steamcmd.exe")
+        if not os.path.isfile(exe):
+            os.makedirs(dest, exist_ok=True)
+            extract_archive(self.fetch(STEAMCMD_URL), dest)
+
+    def _step_starbound(self):
+        sb_dir = self.steam_dir
+        exe = os.path.join(sb_dir, "starbound.exe")
+        steamcmd = os.path.join(os.getcwd(), "steamcmd", "steamcmd.exe")
+
+        install_dir = None
+        if os.path.isfile(exe):
+            self.log_write(f"  → Found existing Starbound at: {sb_dir}")
+        else:
+            # Otherwise, install using SteamCMD
+            install_dir = self.install_dir
+            self.steam_dir = install_dir  # later steps read the assets from here
+            self.log_write(f"  → Installing Starbound to: {install_dir}")
+
+        details = self.mod_details()
+        index = WorkshopIndex()
+        if details is None:
+            todo = list(WORKSHOP_MOD_IDS)  # no metadata, download as given
+        else:
+            todo = index.outdated(details)
+            self.log_write(f"  → {len(details)} workshop item(s), {len(todo)} new or updated")
+        if not todo and install_dir is None:
+            return  # nothing for SteamCMD to do
+
+        # Only pay for a full validate when the local check finds a problem
+        validate = False
+        if install_dir is not None:
+            baseline = load_baseline(install_dir)
+            if baseline:
+                # Baselines from older runs may still list run-time folders
+                baseline = {r: d for r, d in baseline.items() if not baseline_skip(r)}
+            bad = verify_tree(install_dir, baseline, self.hashes) if baseline else None
+            validate = bad is None or bool(bad)
+            if bad:
+                self.log_write(f"  → {len(bad)} game file(s) differ, running a full validate")
+            self.hashes.save()
+
+        # Game and workshop items share one SteamCMD session
+        try:
+            run_steamcmd_batch(steamcmd, install_dir, todo, validate=validate,
+                               on_event=self.steamcmd_event, cancel=self.cancel)
+        finally:
+            for key in [k for k in self.partial if k.startswith("steamcmd")]:
+                self.partial.pop(key, None)
+            if self.status:
+                self.status("")
+        if install_dir is not None:
+            save_baseline(install_dir, self.hashes.hash_tree(install_dir, baseline_skip))
+            self.hashes.save()
+        self.workshop_dir = workshop_content_dir(install_dir)
+        if details is not None:
+            index.record({i: details[i] for i in todo}, self.workshop_dir)
+
+    def mod_details(self):
+        """
+        Metadata for every item in WORKSHOP_MOD_IDS with collections expanded,
+        fetched once per install run; None if the provider can't be reached.
+        """
+        with self.lock:
+            if self.mods is None:
+                try:
+                    provider = make_workshop_provider()
+                    items = resolve_workshop_items(WORKSHOP_MOD_IDS, provider)
+                    found = provider.item_details(items)
+                    # Items without metadata are downloaded every time
+                    unknown = {"time_updated": None, "file_size": None}
+                    self.mods = {i: found.get(i, unknown) for i in items}
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    # Key/Type errors come from entries that aren't shaped as expected
+                    self.log_write(f"⚠ Could not fetch workshop metadata: {e}")
+                    self.mods = False
+            return self.mods or None
+
+    def latest_tag(self):
+        """Latest OSB release tag, resolved once per install run."""
+        with self.lock:
+            if self.osb_tag is None:
+                self.osb_tag = resolve_latest_tag()
+            return self.osb_tag
+
+    def _step_installer_release(self):
+        # Step 1: Resolve tag like v0.1.14
+        tag = self.latest_tag()
+        self.log_write(f"→ Latest OSB release: {tag}")
+
+        # Step 2: Build installer zip URL
+        installer_url = OSB_RELEASE_URL.format(tag=tag)
+        self.log_write("→ Downloading OSB installer ZIP…")
+
+        # Step 3: Download and unzip
+        temp_dir = os.path.join(os.getcwd(), "osb_installer_temp")
+        if os.path.isdir(temp_dir):
+            shutil.rmtree(temp_dir)
+        os.makedirs(temp_dir, exist_ok=True)
+
+        extract_archive(self.fetch(installer_url), temp_dir)
+
+        # Step 4: Run installer (find .exe)
+        exe = None
+        for file in os.listdir(temp_dir):
+            if file.endswith(".exe"):
+                exe = os.path.join(temp_dir, file)
+                break
+
+        if not exe or not os.path.isfile(exe):
+            raise FileNotFoundError("Installer .exe not found in ZIP")
+
+        self.log_write(f"→ Running installer: {exe}")
+
+        # Step 5: Run with /NOICONS to avoid desktop shortcut.
+        # Keep the handle so the merge step can wait for it to exit.
+        self.installer_proc = subprocess.Popen(
+            [exe, "/VERYSILENT", "/NOICONS", "/NORESTART"]
+        )
+
+    def _step_merge_osb_output(self):
+        osb_src = OSB_PROGRAM_DIR
+        osb_dst = self.osb_dir
+
+        self.log_write("→ Waiting for OSB installer to finish...")
+        try:
+            with TRACE.span("wait_installer", "process", path=osb_src):
+                wait_for_output(osb_src, proc=self.installer_proc, cancel=self.cancel)
+        except TimeoutError:
+            raise FileNotFoundError(f"OSB output not found at {osb_src}")
+
+        self.log_write(f"→ Merging all files from {osb_src} → {osb_dst} (overwrite enabled)")
+        # Skip known temporary files that may disappear
+        results = copy_tree(osb_src, osb_dst, skip=is_installer_temp, cancel=self.cancel)
+        failed = [r for r in results if r.error]
+
+        # Check what was copied, and retry anything that came out different
+        copied = [(r.src, r.dst) for r in results if not r.error]
+        for src, dst in verify_copies(copied, self.hashes):
+            self.log_write(f"⚠ {dst} doesn't match its source, copying again")
+            try:
+                copy_file_atomic(src, dst)
+            except OSError as e:
+                failed.append(CopyResult(src, dst, 0, e))
+        self.hashes.save()
+
+        if failed:
+            self.log_write("⚠ Some files could not be copied:")
+            for r in failed:
+                self.log_write(f"   {r.src} → {r.dst} | {r.error}")
+
+        # Attempt to delete installer folder
+        self.log_write(f"→ Cleaning up {osb_src}")
+        try:
+            shutil.rmtree(osb_src)
+        except Exception as e:
+            self.log_write(f"⚠ Could not delete installer output: {e}")
+
+    def _step_update_nightly(self):
+        osb_dst = self.osb_dir
+        if not os.path.isdir(osb_dst):
+            raise FileNotFoundError(f"No OpenStarbound install at {osb_dst}")
+
+        def report(done, total):
+            self.partial["update"] = done / total
+            self.update_progress()
+
+        try:
+            changed, total, fetched = update_from_zip(NIGHTLY_URL, osb_dst, progress=report)
+        finally:
+            self.partial.pop("update", None)
+        self.log_write(
+            f"  → {changed} of {total} file(s) changed, "
+            f"{fetched / 1024 ** 2:.1f} MB downloaded"
+        )
+
+    def _step_assets(self):
+        src = os.path.join(self.steam_dir, "assets")
+        dst = os.path.join(self.osb_dir, "assets")
+        sbinit = os.path.join(self.osb_dir, "win", "sbinit.config")
+        result = deploy_assets(src, dst, sbinit, self.asset_mode)
+        self.log_write(
+            f"  → Assets: {result.strategy}, {result.files} file(s) updated, "
+            f"{result.removed} removed, {result.bytes_saved / 1024 ** 2:.0f} MB not copied"
+        )
+        if result.strategy != "copy":
+            return  # links and clones are src's data, or nothing was placed in dst
+
+        # Verify dst against the source manifest; fix anything that differs
+        expected = self.hashes.hash_tree(src)
+        bad = verify_tree(dst, expected, self.hashes)
+        if bad:
+            self.log_write(f"⚠ {len(bad)} asset file(s) didn't verify, copying again")
+            for rel in bad:
+                target = os.path.join(dst, *rel.split("/"))
+                if os.path.exists(target):
+                    os.remove(target)
+            deploy_assets(src, dst, sbinit, result.strategy)
+        self.hashes.save()
+
+    def _step_deploy_mods(self):
+        mods_dir = os.path.join(self.osb_dir, "mods")
+        os.makedirs(mods_dir, exist_ok=True)
+
+        details = self.mod_details()
+        index = WorkshopIndex().items
+        if details is not None:
+            items = {i: index[i]["path"] for i in details if i in index}
+        else:
+            items = {i: os.path.join(self.workshop_dir, i) for i in WORKSHOP_MOD_IDS}
+
+        counts = {"linked": 0, "packed": 0, "unchanged": 0}
+        for item, path in items.items():
+            if not os.path.isdir(path):
+                self.log_write(f"⚠ Workshop item {item} not found at {path}")
+                continue
+            counts[deploy_mod(path, mods_dir, f"workshop-{item}")] += 1
+
+        # Drop paks of items that are no longer in the list
+        for name in os.listdir(mods_dir):
+            match = re.fullmatch(r"workshop-(\d+)\.pak", name)
+            if match and match.group(1) not in items:
+                os.remove(os.path.join(mods_dir, name))
+
+        self.log_write(
+            f"  → Mods: {counts['packed']} packed, {counts['linked']} linked, "
+            f"{counts['unchanged']} unchanged"
+        )
+
+    def _step_final_osb_copy(self):
+        osb_src = OSB_PROGRAM_DIR
+        osb_dst = self.osb_dir
+
+        if not os.path.isdir(osb_src):
+            return  # nothing left
+
+        self.log_write("→ Final pass: copying any remaining OSB files…")
+        # Avoid temp/locked files but copy everything else
+        for r in copy_tree(osb_src, osb_dst, skip=is_installer_temp, cancel=self.cancel):
+            if r.error:
+                self.log_write(f"⚠ Could not copy {os.path.basename(r.src)}: {r.error}")
+
+        # Try to delete the leftover Program Files folder one last time
+        try:
+            shutil.rmtree(osb_src)
+            self.log_write("→ Final cleanup: Program Files folder removed.")
+        except Exception as e:
+            self.log_write(f"⚠ Could not delete Program Files folder: {e}")
+
+    def _step_fleet(self):
+        targets = self.osb_dirs[1:]
+        failed = []
+
+        def provision(target):
+            try:
+                copied, removed = replicate_install(self.osb_dir, target)
+            except OSError as e:
+                self.log_write(f"⚠ Could not provision {target}: {e}")
+                failed.append(target)
+                return
+            self.log_write(f"  → {target}: {copied} file(s) updated, {removed} removed")
+
+        with ThreadPoolExecutor(max_workers=INSTALL_MAX_WORKERS) as pool:
+            list(pool.map(provision, targets))
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} of {len(targets)} folder(s) could not be provisioned")
+
+def minimize_steam_window():
+    import win32gui
+    import win32con
+
+    def enum_windows_callback(hwnd, result):
+        if win32gui.IsWindowVisible(hwnd):
+            title = win32gui.GetWindowText(hwnd)
+            if "Steam" in title:
+                result.append(hwnd)
+    windows = []
+    win32gui.EnumWindows(enum_windows_callback, windows)
+    for hwnd in windows:
+        try:
+            win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+        except Exception as e:
+            print(f"Could not minimize window {hwnd}: {e}")
+
+def run_headless(args):
+    """Run the install from parsed command-line args; returns the exit code."""
+    osb_dirs = list(args.osb_dir)
+    if args.targets:
+        with open(args.targets, encoding="utf-8") as f:
+            osb_dirs += [line.strip() for line in f
+                         if line.strip() and not line.lstrip().startswith("#")]
+    osb_dirs = list(dict.fromkeys(os.path.abspath(d) for d in osb_dirs))
+
+    steam_dir, install_dir = args.steam_dir, args.install_dir
+    if steam_dir is None and not args.update_only:
+        try:
+            index = steam_index()
+            libraries, steam_dir = get_steam_libraries(index), detect_starbound_install(index)
+        except Exception as e:
+            print(f"→ Steam detection failed: {e}")
+            libraries, steam_dir = [], ""
+        if not steam_dir and not install_dir and libraries:
+            install_dir = os.path.join(libraries[0], "steamapps", "common", "Starbound")
+        if not steam_dir and not install_dir:
+            print("✘ No Starbound install found; pass --steam-dir or --install-dir",
+                  file=sys.stderr)
+            return 2
+
+    lock = threading.Lock()
+
+    def log(txt):
+        with lock:  # steps log from several threads
+            print(txt, flush=True)
+
+    engine = InstallEngine(
+        steam_dir=(steam_dir or "").strip(),
+        install_dir=(install_dir or "").strip(),
+        osb_dirs=osb_dirs,
+        asset_mode=args.asset_mode,
+        update_only=args.update_only,
+        force=args.force,
+        steam_client=not args.no_steam_client,
+        log=log,
+    )
+    try:
+        engine.run()
+    except StepFailed as e:
+        print(f"✘ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Starbound + OpenStarbound installer")
+    parser.add_argument("--force", action="append", default=[], metavar="STEP",
+                        help="re-run STEP even if the install journal has it done "
+                             "(repeatable; 'all' re-runs everything)")
+    parser.add_argument("--headless", action="store_true",
+                        help="install without the wizard, logging to the console")
+    parser.add_argument("--steam-dir", metavar="DIR",
+                        help="existing Starbound install (detected if omitted)")
+    parser.add_argument("--install-dir", metavar="DIR",
+                        help="where SteamCMD should install Starbound if there is none")
+    parser.add_argument("--osb-dir", action="append", default=[], metavar="DIR",
+                        help="OpenStarbound install folder; repeat it to provision "
+                             "several folders from one download (implies --headless)")
+    parser.add_argument("--targets", metavar="FILE",
+                        help="file listing OpenStarbound folders, one per line "
+                             "(implies --headless)")
+    parser.add_argument("--asset-mode", choices=ASSET_MODES, default="auto",
+                        help="how Steam assets are made available (default: auto)")
+    parser.add_argument("--update-only", action="store_true",
+                        help="only update existing OpenStarbound folders to the latest nightly")
+    parser.add_argument("--no-steam-client", action="store_true",
+                        help="don't start the Steam client or minimize its window")
+    args = parser.parse_args()
+
+    if args.headless or args.osb_dir or args.targets:
+        sys.exit(run_headless(args))
+
+    # The wizard imports this module by name; share this copy with it
+    sys.modules.setdefault("OSB_installer", sys.modules[__name__])
+    from osb_wizard import InstallerWizard
+
+    app = InstallerWizard(force=args.force)
+    app.mainloop()
@@ -0,0 +1,452 @@
+"""
+Offline benchmarks for OSB_installer.
+
+Runs the real install steps against local stand-ins: the tests' HTTP
+server (tests/file_server.py) with generated steamcmd / installer / nightly
+zips and GitHub's /releases/latest redirect, the tests' fake steamcmd
+(tests/fake_steamcmd.py) writing a synthetic Starbound tree and workshop
+items, and a fake OSB installer that unpacks its payload into the
+"Program Files" folder. Every benchmark runs in its own process so peak RSS
+is per benchmark.
+
+    python bench_install.py                       # everything
+    python bench_install.py cold warm --quick     # a subset, 1/10 sizes
+    python bench_install.py --json run.json --compare last.json
+
+Install scenarios: cold, warm (re-run of cold), update (update-only against
+the cold install), many-mods. Micro benchmarks: copy (50k small files,
+side by side with the os.walk + copy2 loop it replaced), extract
+(thousands of members), verify (warm hash cache), startup (import and
+first frame), log (100k log lines, Tk thread latency). The last two need a
+display and are skipped without one.
+Fake executables are Python scripts, so this runs on POSIX systems.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import zipfile
+import argparse
+import threading
+import subprocess
+
+REPO_DIR       = os.path.dirname(os.path.abspath(__file__))
+# The HTTP server and fake steamcmd are the ones the tests use
+sys.path.insert(0, os.path.join(REPO_DIR, "tests"))
+from file_server import FileServer  # noqa: E402
+from fake_steamcmd import wrapper  # noqa: E402
+
+OSB_TAG        = "v0.1.14"
+COLLECTION_ID  = "3534616750"
+INSTALLS       = ("cold", "warm", "update", "many-mods")
+MICROS         = ("copy", "extract", "verify", "startup", "log")
+
+FAKE_INSTALLER = r'''#!{python}
+import os, sys, zipfile
+
+payload = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "payload.zip")
+with zipfile.ZipFile(payload) as z:
+    z.extractall(os.environ["BENCH_OSB_PROGRAM_DIR"])
+'''
+
+def seeded(seed, size):
+    return random.Random(seed).randbytes(size)
+
+def executable(name, source):
+    """A zip entry for a script that keeps its exec bit when extracted."""
+    info = zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0))
+    info.external_attr = 0o755 << 16
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info, source.replace("{python}", sys.executable)
+
+def osb_layout(files, total):
+    """(relative path, size) for the files the OSB installer puts down."""
+    big = total // 2
+    rest = (total - big) // max(1, files - 2)
+    layout = [("assets/opensb.pak", big), ("win/starbound.exe", 2 * 1024 * 1024)]
+    layout += [(f"win/lib{i}.dll", rest) for i in range(files - 2)]
+    return layout
+
+def build_zip(entries):
+    """entries: (name or ZipInfo, bytes); returns the zip as bytes."""
+    import io
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as z:
+        for name, data in entries:
+            z.writestr(name, data)
+    return buf.getvalue()
+
+def build_artifacts(args):
+    """{url path: body} for everything the local server hands out."""
+    layout = osb_layout(args.osb_files, args.osb_bytes)
+    payload = build_zip([(rel, seeded(rel, size)) for rel, size in layout]
+                        + [("is-BENCH.tmp", b"scratch")])
+    installer = build_zip([executable("OpenStarbound-Installer.exe", FAKE_INSTALLER),
+                           ("payload.zip", payload)])
+    # The nightly changes about a tenth of the files
+    changed = {rel for i, (rel, _) in enumerate(layout) if i % 10 == 3}
+    nightly = build_zip([
+        (f"OpenStarbound-Windows-Client/{rel}",
+         seeded(rel + ("/nightly" if rel in changed else ""), size))
+        for rel, size in layout
+    ])
+    steamcmd = build_zip([executable("steamcmd.exe", wrapper("{python}"))])
+    return {
+        "/steamcmd.zip": steamcmd,
+        f"/releases/download/{OSB_TAG}/OpenStarbound-Windows-Installer.zip": installer,
+        "/nightly.zip": nightly,
+    }
+
+def serve(artifacts):
+    """Start the stand-in server on a free port, with GitHub's latest redirect."""
+    latest = "/OpenStarbound/OpenStarbound/releases/"
+    files = dict(artifacts)
+    files[latest + "tag/" + OSB_TAG] = b""
+    return FileServer(files, redirects={latest + "latest": latest + "tag/" + OSB_TAG})
+
+def peak_rss_mb():
+    # ru_maxrss survives fork+exec on Linux and would report the parent's
+    # peak, VmHWM starts over with the new program
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+def load_installer(args, name):
+    """Import OSB_installer inside the workspace and point it at the stand-ins."""
+    os.makedirs(args.workspace, exist_ok=True)
+    os.chdir(args.workspace)  # its state files live in the working directory
+    sys.path.insert(0, REPO_DIR)
+    import OSB_installer as O
+
+    base = args.base_url
+    O.STEAMCMD_URL    = base + "/steamcmd.zip"
+    O.OSB_LATEST_URL  = base + "/OpenStarbound/OpenStarbound/releases/latest"
+    O.OSB_RELEASE_URL = base + "/releases/download/{tag}/OpenStarbound-Windows-Installer.zip"
+    O.NIGHTLY_URL     = base + "/nightly.zip"
+    O.OSB_PROGRAM_DIR = os.path.join(args.workspace, "ProgramFiles", "OpenStarbound")
+    O.WORKSHOP_MOD_IDS = [COLLECTION_ID]
+    O.TRACE = O.Tracer(os.path.join(args.workspace, f"trace-{name}"))
+
+    mods = [str(100000 + i) for i in range(args.mods if name == "many-mods" else 1)]
+    workshop = os.path.join(args.workspace, "workshop.json")
+    with open(workshop, "w", encoding="utf-8") as f:
+        json.dump({"collections": {COLLECTION_ID: mods},
+                   "items": {i: {"time_updated": 1700000000, "file_size": None}
+                             for i in mods}}, f)
+    os.environ.update({
+        "OSB_WORKSHOP_JSON":       workshop,
+        "BENCH_OSB_PROGRAM_DIR":   O.OSB_PROGRAM_DIR,
+        "FAKE_STEAMCMD_FILES":     str(args.sb_files),
+        "FAKE_STEAMCMD_BYTES":     str(args.sb_bytes),
+        "FAKE_STEAMCMD_MOD_FILES": str(args.mod_files),
+        "FAKE_STEAMCMD_PAUSE":     "0",
+    })
+    return O
+
+def span_totals(metrics, names, key):
+    return sum(metrics.get(name, {}).get(key, 0) for name in names)
+
+def run_install(args, name):
+    O = load_installer(args, name)
+    sb_dir = os.path.join(args.workspace, "Starbound")
+    log = open(os.path.join(args.workspace, "bench.log"), "a", encoding="utf-8")
+    lock = threading.Lock()
+
+    def write(txt):
+        with lock:
+            log.write(txt + "\n")
+
+    engine = O.InstallEngine(
+        steam_dir=sb_dir if os.path.isfile(os.path.join(sb_dir, "starbound.exe")) else "",
+        install_dir=sb_dir,
+        osb_dirs=[os.path.join(args.workspace, "OpenStarbound")],
+        asset_mode=args.asset_mode,
+        update_only=name == "update",
+        steam_client=False,
+        log=write,
+    )
+    start = time.perf_counter()
+    engine.run()
+    wall = time.perf_counter() - start
+    O.TRACE.save()
+    log.close()
+
+    metrics = O.TRACE.metrics()
+    return {
+        "wall_s": round(wall, 3),
+        "bytes_copied": span_totals(metrics, ("copy", "sync"), "bytes_written"),
+        "bytes_downloaded": span_totals(metrics, ("download", "delta_update"), "bytes_read"),
+        "bytes_extracted": span_totals(metrics, ("extract",), "bytes_written"),
+        "steps": {n[5:]: round(m["wall_s"], 3) for n, m in metrics.items()
+                  if n.startswith("step:")},
+    }
+
+def make_tree(root, files, size, per_dir=500):
+    for i in range(files):
+        folder = os.path.join(root, f"d{i // per_dir}")
+        if i % per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"f{i}"), "wb") as f:
+            f.write(seeded(i, size))
+
+def walk_copy(src, dst):
+    """The merge loop copy_tree replaced: os.walk, then exists/remove/copy2 per file."""
+    count = 0
+    for root, dirs, files in os.walk(src):
+        rel_path = os.path.relpath(root, src)
+        dst_dir = os.path.join(dst, rel_path) if rel_path != "." else dst
+        os.makedirs(dst_dir, exist_ok=True)
+        for f in files:
+            dst_file = os.path.join(dst_dir, f)
+            if os.path.exists(dst_file):
+                os.remove(dst_file)
+            shutil.copy2(os.path.join(root, f), dst_file)
+            count += 1
+    return count
+
+def run_copy(args, O):
+    """copy_tree against the old walk loop, into an empty folder and over a full one."""
+    src = os.path.join(args.workspace, "src")
+    make_tree(src, args.copy_files, 2048)
+
+    def rate(copy, dst):
+        start = time.perf_counter()
+        count = copy(src, dst)
+        wall = time.perf_counter() - start
+        return count / wall, wall
+
+    def tree(src, dst):
+        results = O.copy_tree(src, dst)
+        assert not any(r.error for r in results)
+        return len(results)
+
+    baseline_dst, dst = os.path.join(args.workspace, "old"), os.path.join(args.workspace, "new")
+    baseline, _ = rate(walk_copy, baseline_dst)
+    fresh, wall = rate(tree, dst)
+    baseline_over, _ = rate(walk_copy, baseline_dst)
+    over, _ = rate(tree, dst)
+    return {"wall_s": round(wall, 3), "files": args.copy_files,
+            "files_per_s": round(fresh), "baseline_files_per_s": round(baseline),
+            "speedup": f"x{fresh / baseline:.2f}",
+            "overwrite_files_per_s": round(over),
+            "baseline_overwrite_files_per_s": round(baseline_over),
+            "overwrite_speedup": f"x{over / baseline_over:.2f}",
+            "bytes_copied": args.copy_files * 2048}
+
+def run_extract(args, O):
+    archive = os.path.join(args.workspace, "members.zip")
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        for i in range(args.extract_members):
+            z.writestr(f"assets/{i % 50}/member{i}.json",
+                       json.dumps({"id": i, "pad": "x" * (i % 8 * 512)}))
+    start = time.perf_counter()
+    count = O.extract_archive(archive, os.path.join(args.workspace, "out"))
+    wall = time.perf_counter() - start
+    return {"wall_s": round(wall, 3), "files": count,
+            "files_per_s": round(count / wall)}
+
+def run_verify(args, O):
+    root = os.path.join(args.workspace, "tree")
+    make_tree(root, args.verify_files, 16 * 1024)
+    cache_path = os.path.join(args.workspace, "hashes.json")
+    start = time.perf_counter()
+    cache = O.HashCache(cache_path)
+    expected = cache.hash_tree(root)
+    cache.save()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    bad = O.verify_tree(root, expected, O.HashCache(cache_path))
+    warm = time.perf_counter() - start
+    return {"wall_s": round(warm, 3), "cold_s": round(cold, 3),
+            "files": len(expected), "mismatches": len(bad)}
+
+def run_startup(args, O):
+    def timed(code):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=args.workspace,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return None, time.perf_counter() - start
+        return float(out.stdout.split()[-1]), time.perf_counter() - start
+
+    prelude = f"import sys, time; sys.path.insert(0, {REPO_DIR!r}); t = time.perf_counter(); "
+    imported, process = timed(prelude + "import OSB_installer; print(time.perf_counter() - t)")
+    frame, _ = timed(prelude + "import osb_wizard as W; "
+                     "app = W.InstallerWizard(libraries=[], existing_sb=''); app.update(); "
+                     "print(time.perf_counter() - t)")
+    result = {"wall_s": round(process, 3), "import_s": round(imported, 3)}
+    if frame is None:
+        result["first_frame_s"] = "skipped (no display)"
+    else:
+        result["first_frame_s"] = round(frame, 3)
+    return result
+
+def run_log(args, O):
+    import osb_wizard as W
+
+    try:
+        app = W.InstallerWizard(libraries=[], existing_sb="")
+    except Exception as e:
+        return {"skipped": f"no display ({e.__class__.__name__})"}
+    page = app.frames[W.StepInstall]
+    written = threading.Event()
+    gaps = []
+    last = [time.perf_counter()]
+
+    def beat():
+        now = time.perf_counter()
+        gaps.append(now - last[0])
+        last[0] = now
+        if written.is_set() and page.events.empty():
+            app.quit()
+        else:
+            app.after(10, beat)
+
+    def writer():
+        for i in range(args.log_lines):
+            page.log_write(f"  → line {i}: " + "x" * 60)
+        written.set()
+
+    start = time.perf_counter()
+    threading.Thread(target=writer, daemon=True).start()
+    app.after(10, beat)
+    app.mainloop()
+    wall = time.perf_counter() - start
+    app.destroy()
+    gaps.sort()
+    return {"wall_s": round(wall, 3), "lines": args.log_lines,
+            "max_latency_ms": round(max(gaps[-1] - 0.010, 0) * 1000, 1),
+            "p99_latency_ms": round(max(gaps[int(len(gaps) * 0.99)] - 0.010, 0) * 1000, 1)}
+
+def run_child(args):
+    """Entry point of a benchmark process; prints its result as JSON."""
+    name = args.child
+    if name in INSTALLS:
+        result = run_install(args, name)
+    else:
+        O = load_installer(args, name)
+        result = globals()["run_" + name](args, O)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+def run_benchmark(args, name, workspace, server):
+    """Run one benchmark in a fresh process and return its result dict."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name,
+           "--workspace", workspace, "--base-url", server.url("")]
+    for key in ("sb_files", "sb_bytes", "osb_files", "osb_bytes", "mods", "mod_files",
+                "copy_files", "extract_members", "verify_files", "log_lines"):
+        cmd += ["--" + key.replace("_", "-"), str(getattr(args, key))]
+    cmd += ["--asset-mode", args.asset_mode]
+    served = server.sent
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    if name in INSTALLS:
+        result["bytes_served"] = server.sent - served
+    return result
+
+def print_table(results, previous):
+    print(f"{'benchmark':<10} {'wall s':>9} {'change':>8} {'peak MB':>8} {'copied MB':>10}  notes")
+    for name, r in results.items():
+        if "error" in r or "skipped" in r:
+            print(f"{name:<10} {r.get('error') or r.get('skipped')}")
+            continue
+        change = ""
+        old = previous.get(name, {}).get("wall_s")
+        if isinstance(old, (int, float)) and old:
+            change = f"{(r['wall_s'] - old) / old * 100:+.1f}%"
+        copied = r.get("bytes_copied")
+        copied = f"{copied / 1024 ** 2:.1f}" if copied is not None else "-"
+        notes = ", ".join(f"{k}={v}" for k, v in r.items()
+                          if k not in ("wall_s", "peak_rss_mb", "bytes_copied", "steps"))
+        print(f"{name:<10} {r['wall_s']:>9.3f} {change:>8} {r['peak_rss_mb'] or '-':>8} "
+              f"{copied:>10}  {notes}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OSB_installer benchmarks")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help=f"benchmarks to run (default: all): {', '.join(INSTALLS + MICROS)}")
+    parser.add_argument("--quick", action="store_true", help="run everything at 1/10 size")
+    parser.add_argument("--workspace", help="scratch folder (default: a temp dir, removed after)")
+    parser.add_argument("--json", metavar="FILE", help="write the results here")
+    parser.add_argument("--compare", metavar="FILE", help="show wall time change against an earlier --json")
+    parser.add_argument("--asset-mode", default="copy",
+                        help="asset strategy for install scenarios (default: copy)")
+    parser.add_argument("--sb-files", type=int, default=2000, help="files in the fake Starbound tree")
+    parser.add_argument("--sb-bytes", type=int, default=256 * 1024 ** 2, help="bytes in the fake Starbound tree")
+    parser.add_argument("--osb-files", type=int, default=60, help="files the fake OSB installer writes")
+    parser.add_argument("--osb-bytes", type=int, default=48 * 1024 ** 2, help="bytes the fake OSB installer writes")
+    parser.add_argument("--mods", type=int, default=50, help="workshop items in many-mods")
+    parser.add_argument("--mod-files", type=int, default=40, help="files per loose workshop item")
+    parser.add_argument("--copy-files", type=int, default=50000)
+    parser.add_argument("--extract-members", type=int, default=5000)
+    parser.add_argument("--verify-files", type=int, default=5000)
+    parser.add_argument("--log-lines", type=int, default=100000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    names = args.names or list(INSTALLS + MICROS)
+    unknown = set(names) - set(INSTALLS + MICROS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    if args.quick:
+        for key in ("sb_files", "sb_bytes", "osb_files", "osb_bytes", "mods",
+                    "copy_files", "extract_members", "verify_files", "log_lines"):
+            setattr(args, key, max(10, getattr(args, key) // 10))
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    import tempfile
+
+    root = args.workspace or tempfile.mkdtemp(prefix="osb_bench_")
+    server = serve(build_artifacts(args))
+    results = {}
+    try:
+        # warm and update re-run the cold install's workspace
+        if {"warm", "update"} & set(names) and "cold" not in names:
+            names.insert(0, "cold")
+            hidden = {"cold"}
+        else:
+            hidden = set()
+        for name in sorted(names, key=(INSTALLS + MICROS).index):
+            workspace = os.path.join(root, "main" if name in ("cold", "warm", "update") else name)
+            if name not in ("warm", "update"):
+                shutil.rmtree(workspace, ignore_errors=True)
+            print(f"→ {name}…", file=sys.stderr, flush=True)
+            result = run_benchmark(args, name, workspace, server)
+            if name not in hidden:
+                results[name] = result
+    finally:
+        server.close()
+        if not args.workspace:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_table(results, previous)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# The Tkinter wizard. It is only a front end for InstallEngine; the engine
+# and the --headless command line live in OSB_installer.py and never import
+# tkinter, so they also run on machines without Tk.
+import os
+import threading
+import subprocess
+import time
+import queue
+import tkinter as tk
+from collections import deque
+from tkinter import ttk, filedialog, messagebox
+
+from OSB_installer import (
+    ASSET_MODES, LOG_MAX_LINES, LOG_PATH, LOG_PUMP_BUDGET, LOG_PUMP_MS,
+    InstallEngine, StepFailed, detect_starbound_install, get_steam_libraries,
+    steam_index,
+)
+
+def bring_to_front(root):
+    """Bring the Tk window back on top."""
+    root.deiconify()
+    root.lift()
+    root.focus_force()
+
+class InstallerWizard(tk.Tk):
+    def __init__(self, libraries=None, existing_sb="", force=()):
+        super().__init__()
+        self.title("Starbound + OpenStarbound Installer")
+        self.resizable(False, False)
+
+        self.steam_dir        = tk.StringVar()
+        self.install_dir      = tk.StringVar()
+        self.osb_dir          = tk.StringVar(
+            value=os.path.join(os.getcwd(), "OpenStarbound")
+        )
+        self.run_when_done    = tk.BooleanVar(value=True)
+        self.asset_mode       = tk.StringVar(value="auto")
+        self.update_only      = tk.BooleanVar(value=False)
+        # Steps to re-run even if the install journal has them done
+        self.force            = set(force)
+
+        # Without detection results, paint first and detect in the background
+        self.detecting        = libraries is None
+        self.set_detection(libraries or [], existing_sb)
+
+        # Prepare wizard frames
+        self.frames = {}
+        for Frame in (StepPaths, StepInstall, StepFinish):
+            page = Frame(self)
+            self.frames[Frame] = page
+            page.grid(row=0, column=0, sticky="nsew")
+
+        self.show_frame(StepPaths)
+
+        if self.detecting:
+            self.detected = queue.Queue()
+            threading.Thread(target=self.detect, daemon=True).start()
+            self.after(50, self.poll_detection)
+
+    def set_detection(self, libraries, existing_sb):
+        """Store detection results and derive the default paths."""
+        self.libraries        = libraries
+        self.steam_installed  = bool(existing_sb)
+        self.steam_dir.set(existing_sb)
+        # Default install_dir for SteamCMD (first library + starbound path)
+        default_install = ""
+        if not self.steam_installed and libraries:
+            default_install = os.path.join(
+                libraries[0], "steamapps", "common", "Starbound"
+            )
+        self.install_dir.set(default_install)
+
+    def detect(self):
+        """Runs on a worker thread; hands results to the Tk thread via a queue."""
+        try:
+            index = steam_index()
+            result = (get_steam_libraries(index), detect_starbound_install(index))
+        except Exception as e:
+            print(f"→ Steam detection failed: {e}")
+            result = ([], "")
+        self.detected.put(result)
+
+    def poll_detection(self):
+        try:
+            libraries, existing_sb = self.detected.get_nowait()
+        except queue.Empty:
+            self.after(50, self.poll_detection)
+            return
+
+        self.detecting = False
+        self.set_detection(libraries, existing_sb)
+        # StepPaths lays itself out from the results, so rebuild it
+        self.frames[StepPaths].destroy()
+        page = StepPaths(self)
+        self.frames[StepPaths] = page
+        page.grid(row=0, column=0, sticky="nsew")
+        self.show_frame(StepPaths)
+
+    def show_frame(self, frame_cls):
+        self.frames[frame_cls].tkraise()
+
+class StepPaths(tk.Frame):
+    def __init__(self, master):
+        super().__init__(master, padx=10, pady=10)
+        tk.Label(self,
+                text="Step 1: Locate or Install Starbound",
+                font=("Segoe UI", 12, "bold"))\
+        .grid(columnspan=3, pady=(0,10))
+
+        if master.detecting:
+            tk.Label(self, text="Looking for an existing Starbound install…")\
+            .grid(row=1, column=0, columnspan=3, sticky="w")
+        elif master.steam_installed:
+            # Only show existing install path
+            tk.Label(self, text="Existing Starbound Install:")\
+            .grid(row=1, column=0, sticky="e")
+            tk.Entry(self, width=40, textvariable=master.steam_dir)\
+            .grid(row=1, column=1)
+            tk.Button(self, text="Browse…",
+                    command=lambda: self.browse(master.steam_dir))\
+            .grid(row=1, column=2)
+        else:
+            # Only show install location field
+            tk.Label(self, text="Install Starbound Here:")\
+            .grid(row=1, column=0, sticky="e")
+            tk.Entry(self, width=40, textvariable=master.install_dir)\
+            .grid(row=1, column=1)
+            tk.Button(self, text="Browse…",
+                    command=lambda: self.browse(master.install_dir))\
+            .grid(row=1, column=2)
+
+        # Always show OSB install path
+        tk.Label(self, text="OpenStarbound Install Dir:")\
+        .grid(row=2, column=0, sticky="e", pady=10)
+        tk.Entry(self, width=40, textvariable=master.osb_dir)\
+        .grid(row=2, column=1)
+        tk.Button(self, text="Browse…",
+                command=lambda: self.browse(master.osb_dir))\
+        .grid(row=2, column=2)
+
+        tk.Label(self, text="Steam Assets:")\
+        .grid(row=3, column=0, sticky="e")
+        tk.OptionMenu(self, master.asset_mode, *ASSET_MODES)\
+        .grid(row=3, column=1, sticky="w")
+
+        tk.Checkbutton(self,
+                    text="Only update an existing OpenStarbound to the latest nightly",
+                    variable=master.update_only)\
+        .grid(row=4, column=0, columnspan=3, sticky="w")
+
+        tk.Button(self, text="Next →", width=10,
+                state="disabled" if master.detecting else "normal",
+                command=self.validate)\
+        .grid(row=5, column=2, pady=15)
+
+    def browse(self, var):
+        path = filedialog.askdirectory()
+        if path:
+            var.set(path)
+
+    def validate(self):
+        m = self.master
+        # Validate required fields
+        if m.update_only.get():
+            pass  # Starbound itself isn't touched
+        elif m.steam_installed:
+            if not m.steam_dir.get().strip():
+                return messagebox.showerror(
+                    "Error", "Please specify existing Starbound path."
+                )
+        else:
+            if not m.install_dir.get().strip():
+                return messagebox.showerror(
+                    "Error", "Please specify where to install Starbound."
+                )
+        if not m.osb_dir.get().strip():
+            return messagebox.showerror(
+                "Error", "Please specify OpenStarbound install directory."
+            )
+        m.show_frame(StepInstall)
+        m.frames[StepInstall].start_install()
+
+class StepInstall(tk.Frame):
+    def __init__(self, master):
+        super().__init__(master, padx=10, pady=10)
+        tk.Label(self,
+                text="Step 2: Installing…",
+                font=("Segoe UI", 12, "bold"))\
+        .pack(anchor="w")
+
+        self.progress = ttk.Progressbar(self, length=500, mode="determinate")
+        self.progress.pack(pady=(5,0))
+        self.status_label = tk.Label(self, text="", anchor="w", fg="#555555")
+        self.status_label.pack(fill="x", pady=(0,10))
+
+        self.log = tk.Text(self, width=70, height=15,
+                        bg="#f9f9f9", state="disabled")
+        self.log.pack()
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(fill="x", pady=10)
+        tk.Button(btn_frame, text="← Back",
+                command=lambda: master.show_frame(StepPaths))\
+        .pack(side="left")
+        self.next_btn = tk.Button(btn_frame, text="Next →",
+                                state="disabled",
+                                command=lambda: master.show_frame(StepFinish))
+        self.next_btn.pack(side="right")
+
+        self.engine = None
+        self.lock   = threading.Lock()
+
+        # Worker threads never touch widgets; they queue events that
+        # pump() applies on the Tk thread in batches.
+        self.events   = queue.Queue()
+        self.history  = deque(maxlen=LOG_MAX_LINES)
+        self.log_file = None
+        self.after(LOG_PUMP_MS, self.pump)
+
+    def log_write(self, txt):
+        """Thread-safe: append to the log file and queue the line for display."""
+        with self.lock:
+            if self.log_file:
+                self.log_file.write(txt + "\n")
+        self.events.put(("log", txt))
+
+    def ui_call(self, func, *args):
+        """Run func(*args) on the Tk thread."""
+        self.events.put(("call", func, args))
+
+    def set_progress(self, value):
+        """Thread-safe: queue a new progress bar value."""
+        self.events.put(("progress", value))
+
+    def set_status(self, text):
+        """Thread-safe: queue a new status line under the progress bar."""
+        self.events.put(("status", text))
+
+    def pump(self):
+        """
+        Drain queued events for at most LOG_PUMP_BUDGET seconds. Log lines
+        are inserted in one batch and only the newest LOG_MAX_LINES are kept
+        on screen; of several progress or status updates only the last one
+        is applied.
+        """
+        lines = []
+        progress = None
+        status = None
+        deadline = time.perf_counter() + LOG_PUMP_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "log":
+                lines.append(event[1])
+            elif event[0] == "progress":
+                progress = event[1]
+            elif event[0] == "status":
+                status = event[1]
+            else:
+                event[1](*event[2])
+
+        if lines:
+            self.history.extend(lines)
+            self.log.config(state="normal")
+            if len(lines) >= LOG_MAX_LINES:
+                self.log.delete("1.0", "end")
+                self.log.insert("end", "\n".join(self.history) + "\n")
+            else:
+                self.log.insert("end", "\n".join(lines) + "\n")
+                # Text always holds one trailing empty line
+                excess = int(self.log.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+                if excess > 0:
+                    self.log.delete("1.0", f"{excess + 1}.0")
+            self.log.see("end")
+            self.log.config(state="disabled")
+        if progress is not None:
+            self.progress["value"] = progress
+        if status is not None:
+            self.status_label.config(text=status)
+        if lines:
+            with self.lock:
+                if self.log_file:
+                    self.log_file.flush()
+
+        self.after(LOG_PUMP_MS, self.pump)
+
+    def start_install(self):
+        with self.lock:
+            if self.log_file is None:
+                self.log_file = open(LOG_PATH, "w", encoding="utf-8")
+        m = self.master
+        self.engine = InstallEngine(
+            steam_dir=m.steam_dir.get().strip(),
+            install_dir=m.install_dir.get().strip(),
+            osb_dirs=[m.osb_dir.get()],
+            asset_mode=m.asset_mode.get(),
+            update_only=m.update_only.get(),
+            force=m.force,
+            log=self.log_write,
+            progress=self.set_progress,
+            status=self.set_status,
+            on_steam=lambda: self.ui_call(bring_to_front, m),
+        )
+        threading.Thread(target=self._install, daemon=True).start()
+
+    def _install(self):
+        engine = self.engine
+        self.ui_call(self.progress.config, {"maximum": len(engine.steps())})
+        try:
+            engine.run()
+        except StepFailed as e:
+            self.ui_call(messagebox.showerror, "Install Error", str(e))
+            return
+        finally:
+            # SteamCMD may have installed Starbound somewhere new
+            self.ui_call(self.master.steam_dir.set, engine.steam_dir)
+
+        self.ui_call(self.next_btn.config, {"state": "normal"})
+
+class StepFinish(tk.Frame):
+    def __init__(self, master):
+        super().__init__(master, padx=10, pady=10)
+        tk.Label(self, text="Step 3: Done!",
+                font=("Segoe UI", 12, "bold"))\
+        .pack(pady=(0,10))
+
+        tk.Checkbutton(self,
+                    text="Run Starbound now",
+                    variable=master.run_when_done)\
+        .pack()
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(fill="x", pady=15)
+        tk.Button(btn_frame, text="← Back",
+                command=lambda: master.show_frame(StepInstall))\
+        .pack(side="left")
+        tk.Button(btn_frame, text="Finish", width=10,
+                command=self.finish)\
+        .pack(side="right")
+
+    def finish(self):
+        if self.master.run_when_done.get():
+            exe = os.path.join(self.master.osb_dir.get(),
+                            "win", "starbound.exe")
+            if os.path.isfile(exe):
+                subprocess.Popen([exe])
+            else:
+                messagebox.showwarning(
+                    "Warning", f"Could not find:\n{exe}"
+                )
+        self.master.destroy()
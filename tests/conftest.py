@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_steamcmd import wrapper
+from file_server import FileServer
+
+
+@pytest.fixture
+def file_server():
+    """Factory: file_server(files, **options) -> running FileServer."""
+    servers = []
+
+    def start(files, **options):
+        server = FileServer(files, **options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+class FakeSteamCmd:
+    """Handle on tests/fake_steamcmd.py: an executable wrapper and its run log."""
+
+    def __init__(self, root):
+        self.script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_steamcmd.py")
+        self.log    = os.path.join(root, "steamcmd_runs.jsonl")
+        self.exe    = os.path.join(root, "steamcmd", "steamcmd.exe")
+        os.makedirs(os.path.dirname(self.exe))
+        with open(self.exe, "w", encoding="utf-8") as f:
+            f.write(wrapper(sys.executable, self.script))
+        os.chmod(self.exe, 0o755)
+
+    def args(self, runscript):
+        return [sys.executable, self.script, "+runscript", runscript]
+
+    def runs(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def fake_steamcmd(tmp_path, monkeypatch):
+    fake = FakeSteamCmd(str(tmp_path))
+    monkeypatch.setenv("FAKE_STEAMCMD_LOG", fake.log)
+    return fake
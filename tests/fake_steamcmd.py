@@ -0,0 +1,137 @@
+"""
+Stand-in for steamcmd.exe. Replays SteamCMD's console output for the
+commands in its +runscript: a login banner, then \\r-separated progress lines
+and a result for app_update and each workshop_download_item.
+
+Every run appends {"pid", "argv", "script"} as a JSON line to
+$FAKE_STEAMCMD_LOG if it is set. The first $FAKE_STEAMCMD_STALL runs hang
+without output halfway through their first download, $FAKE_STEAMCMD_EXIT
+sets the exit code and $FAKE_STEAMCMD_PAUSE scales the pauses between
+lines. Workshop item 111 always fails.
+
+With $FAKE_STEAMCMD_FILES set, app_update also writes a synthetic
+Starbound tree of that many files and $FAKE_STEAMCMD_BYTES bytes, and each
+workshop item gets a folder: odd IDs hold one .pak, even IDs
+$FAKE_STEAMCMD_MOD_FILES loose files. Files already in place are kept, as
+after a validate. Items land under $FAKE_STEAMCMD_DIR (the folder of the
+wrapper) unless the script forces an install dir.
+"""
+import os
+import sys
+import json
+import time
+import random
+
+BANNER = """\
+Redirecting stderr to 'logs/stderr.txt'
+[  0%] Checking for available updates...
+[----] Verifying installation...
+Steam Console Client (c) Valve Corporation - version 1716584207
+-- type 'quit' to exit --
+Loading Steam API...OK
+
+Connecting anonymously to Steam Public...OK
+Waiting for client config...OK
+Waiting for user info...OK
+"""
+APP_SIZE = 3_120_000_000
+ITEM_SIZE = 4_800_000
+PAUSE = float(os.environ.get("FAKE_STEAMCMD_PAUSE", "1"))
+
+
+def wrapper(python, script=os.path.abspath(__file__)):
+    """Text of a steamcmd.exe shell wrapper that runs this script."""
+    return (f'#!/bin/sh\nFAKE_STEAMCMD_DIR="$(cd "$(dirname "$0")" && pwd)" '
+            f'exec "{python}" "{script}" "$@"\n')
+
+
+def say(text, pause=0.02):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+    time.sleep(pause * PAUSE)
+
+
+def write(path, size, seed):
+    if os.path.isfile(path) and os.path.getsize(path) == size:
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(random.Random(seed).randbytes(size))
+    return size
+
+
+def write_app(root):
+    files = int(os.environ["FAKE_STEAMCMD_FILES"])
+    total = int(os.environ.get("FAKE_STEAMCMD_BYTES", "0"))
+    big = total * 7 // 10
+    small = (total - big) // max(1, files - 2)
+    layout = [("assets/packed.pak", big), ("starbound.exe", 1024)]
+    layout += [(f"assets/user/{i // 200}/file{i}.dat", small) for i in range(files - 2)]
+    for rel, size in layout:
+        write(os.path.join(root, *rel.split("/")), size, rel)
+
+
+def write_item(folder, item):
+    if int(item) % 2:
+        return write(os.path.join(folder, "contents.pak"), 256 * 1024, item)
+    size = write(os.path.join(folder, "_metadata"), 64, item)
+    for i in range(int(os.environ.get("FAKE_STEAMCMD_MOD_FILES", "0"))):
+        size += write(os.path.join(folder, "items", f"item{i}.json"), 4096, f"{item}/{i}")
+    return size
+
+
+def main():
+    log = os.environ.get("FAKE_STEAMCMD_LOG")
+    previous = 0
+    if log and os.path.exists(log):
+        with open(log, encoding="utf-8") as f:
+            previous = sum(1 for _ in f)
+    stall = previous < int(os.environ.get("FAKE_STEAMCMD_STALL", "0"))
+    content = "FAKE_STEAMCMD_FILES" in os.environ
+
+    script = ""
+    if "+runscript" in sys.argv:
+        with open(sys.argv[sys.argv.index("+runscript") + 1], encoding="utf-8") as f:
+            script = f.read()
+    if log:
+        with open(log, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"pid": os.getpid(), "argv": sys.argv[1:],
+                                "script": script}) + "\n")
+
+    root = os.environ.get("FAKE_STEAMCMD_DIR") or os.getcwd()
+    say(BANNER)
+    for line in script.splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "force_install_dir":
+            root = line.split(None, 1)[1].strip().strip('"')
+        elif words[0] == "app_update":
+            if content:
+                write_app(root)
+            say(" Update state (0x3) reconfiguring, progress: 0.00 (0 / 0)\n")
+            for step in range(1, 5):
+                done = APP_SIZE * step // 8
+                say(f" Update state (0x61) downloading, progress: {done / APP_SIZE * 100:.2f} "
+                    f"({done} / {APP_SIZE})\r", 0.05)
+                if stall and step == 2:
+                    time.sleep(3600)  # stuck: no output, no bytes
+            say(f" Update state (0x81) verifying update, progress: 100.00 "
+                f"({APP_SIZE} / {APP_SIZE})\n")
+            say(f"Success! App '{words[1]}' fully installed.\n")
+        elif words[0] == "workshop_download_item":
+            item = words[2]
+            say(f"Downloading item {item} ...\n")
+            if item == "111":
+                say(f"ERROR! Download item {item} failed (Failure).\n")
+                continue
+            if stall and "app_update" not in script:
+                time.sleep(3600)
+            folder = os.path.join(root, "steamapps", "workshop", "content", "211820", item)
+            size = write_item(folder, item) if content else ITEM_SIZE
+            say(f'Success. Downloaded item {item} to "{folder}" ({size} bytes) \n')
+    sys.exit(int(os.environ.get("FAKE_STEAMCMD_EXIT", "0")))
+
+
+if __name__ == "__main__":
+    main()
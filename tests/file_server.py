@@ -0,0 +1,147 @@
+"""
+Local HTTP server shared by the download tests (through the file_server
+fixture in conftest.py) and bench_install.py.
+"""
+import time
+import socket
+import hashlib
+import threading
+import http.server
+
+
+class FileServer:
+    """
+    Local HTTP/1.1 server for download tests and the benchmarks. Serves files
+    from a dict with ETags, optional Range support, and fault injection: the
+    first `drops` responses are cut off after `drop_after` body bytes, `rate`
+    limits every connection to that many bytes per second, and `errors` maps
+    a request number (from 0) to an error status to answer it with.
+    `redirects` maps paths to a Location answered with 302. `sent` counts
+    body bytes served.
+    """
+
+    def __init__(self, files, ranges=True, drop_after=None, drops=0, rate=None,
+                 errors=None, redirects=None):
+        self.files      = {path: (body, '"%s"' % hashlib.md5(body).hexdigest())
+                           for path, body in files.items()}
+        self.ranges     = ranges
+        self.drop_after = drop_after
+        self.drops      = drops
+        self.rate       = rate
+        self.errors     = dict(errors or {})
+        self.redirects  = dict(redirects or {})
+        self.lock       = threading.Lock()
+        self.requests   = []
+        self.peers      = set()
+        self.sent       = 0
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                server.respond(self, head=True)
+
+            def do_GET(self):
+                server.respond(self)
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def take_drop(self):
+        with self.lock:
+            if self.drop_after is not None and self.drops > 0:
+                self.drops -= 1
+                return True
+            return False
+
+    def respond(self, handler, head=False):
+        with self.lock:
+            error = self.errors.get(len(self.requests))
+            self.requests.append((handler.command, handler.path, dict(handler.headers)))
+            self.peers.add(handler.client_address)
+        if handler.path in self.redirects and not error:
+            handler.send_response(302)
+            handler.send_header("Location", self.redirects[handler.path])
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if error or handler.path not in self.files:
+            handler.send_response(error or 404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        body, etag = self.files[handler.path]
+        if handler.headers.get("If-None-Match") == etag:
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        size = len(body)
+        start, end, status = 0, size - 1, 200
+        spec = handler.headers.get("Range")
+        if self.ranges and spec and handler.headers.get("If-Range", etag) == etag:
+            first, _, last = spec.split("=", 1)[1].partition("-")
+            if not first:
+                start = max(0, size - int(last))
+            else:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                handler.send_response(416)
+                handler.send_header("Content-Range", f"bytes */{size}")
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            status = 206
+
+        handler.send_response(status)
+        handler.send_header("ETag", etag)
+        handler.send_header("Content-Length", str(end - start + 1))
+        if self.ranges:
+            handler.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        handler.end_headers()
+        if head:
+            return
+
+        data = body[start:end + 1]
+        limit = len(data)
+        drop = len(data) > 1 and self.take_drop()
+        if drop:
+            limit = min(self.drop_after, len(data) - 1)
+        began = time.monotonic()
+        sent = 0
+        try:
+            while sent < limit:
+                chunk = data[sent:min(limit, sent + 16384)]
+                handler.wfile.write(chunk)
+                sent += len(chunk)
+                with self.lock:
+                    self.sent += len(chunk)
+                if self.rate:
+                    ahead = sent / self.rate - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            handler.close_connection = True  # the client gave up
+            return
+        if drop:
+            handler.wfile.flush()
+            handler.connection.shutdown(socket.SHUT_RDWR)
+            handler.close_connection = True
@@ -0,0 +1,137 @@
+import os
+import json
+
+import pytest
+
+import OSB_installer as O
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def same_file(a, b):
+    sa, sb = os.stat(a), os.stat(b)
+    return (sa.st_dev, sa.st_ino) == (sb.st_dev, sb.st_ino)
+
+
+def refuse(src, dst):
+    raise OSError("not supported here")
+
+
+def fake_reflink(src, dst):
+    O.copy_file_atomic(src, dst)  # a clone is a separate inode too
+
+
+class Setup:
+    def __init__(self, root):
+        self.src    = os.path.join(root, "Steam", "assets")
+        self.dst    = os.path.join(root, "OpenStarbound", "assets")
+        self.sbinit = os.path.join(root, "OpenStarbound", "win", "sbinit.config")
+        write(os.path.join(self.src, "packed.pak"), b"pak")
+        write(os.path.join(self.src, "user", "readme.txt"), b"readme")
+
+    def deploy(self, mode):
+        return O.deploy_assets(self.src, self.dst, self.sbinit, mode)
+
+    def pair(self, rel="packed.pak"):
+        return os.path.join(self.src, rel), os.path.join(self.dst, rel)
+
+    def asset_dirs(self):
+        with open(self.sbinit, encoding="utf-8") as f:
+            return json.load(f)["assetDirectories"]
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(O, "reflink_file", refuse)
+    return Setup(str(tmp_path))
+
+
+def test_auto_falls_back_to_hardlink(setup):
+    result = setup.deploy("auto")
+    assert result.strategy == "hardlink"
+    assert result.files == 2
+    assert result.bytes_saved == len(b"pak") + len(b"readme")
+    assert same_file(*setup.pair())
+    assert setup.deploy("auto").files == 0
+
+
+def test_auto_falls_back_to_sbinit_without_links(setup, monkeypatch):
+    monkeypatch.setattr(O, "hardlink_file", refuse)
+    result = setup.deploy("auto")
+    assert result.strategy == "sbinit"
+    assert setup.asset_dirs()[0] == os.path.join(setup.src, "")
+    assert not os.path.exists(setup.pair()[1])
+
+
+def test_explicit_mode_starts_the_chain_there(setup):
+    result = setup.deploy("copy")
+    assert result == O.AssetDeployment("copy", 2, 0, 0)
+    assert not same_file(*setup.pair())
+    assert read(setup.pair()[1]) == b"pak"
+
+
+def test_sbinit_round_trip_keeps_other_settings(setup):
+    write(setup.sbinit, json.dumps({
+        "assetDirectories": [os.path.join("..", "assets", ""), os.path.join("..", "mods", "")],
+        "defaultConfiguration": {"gameServerPort": 21025},
+    }).encode())
+    setup.deploy("copy")
+
+    result = setup.deploy("sbinit")
+    assert result.removed == 2
+    assert not os.path.exists(setup.pair()[1])
+    assert setup.asset_dirs() == [os.path.join(setup.src, ""),
+                                  os.path.join("..", "assets", ""),
+                                  os.path.join("..", "mods", "")]
+    assert setup.deploy("sbinit").removed == 0
+    assert setup.asset_dirs().count(os.path.join(setup.src, "")) == 1
+
+    setup.deploy("copy")
+    assert setup.asset_dirs() == [os.path.join("..", "assets", ""),
+                                  os.path.join("..", "mods", "")]
+    with open(setup.sbinit, encoding="utf-8") as f:
+        assert json.load(f)["defaultConfiguration"] == {"gameServerPort": 21025}
+    assert read(setup.pair()[1]) == b"pak"
+
+
+def test_hardlink_to_copy_unlinks_every_file(setup):
+    setup.deploy("hardlink")
+    result = setup.deploy("copy")
+    assert result.strategy == "copy"
+    assert result.files == 2
+    for rel in ("packed.pak", "user/readme.txt"):
+        src, dst = setup.pair(rel)
+        assert not same_file(src, dst)
+        assert read(dst) == read(src)
+    assert setup.deploy("copy").files == 0
+
+
+def test_hardlink_to_reflink_clones_every_file(setup, monkeypatch):
+    setup.deploy("hardlink")
+    monkeypatch.setattr(O, "reflink_file", fake_reflink)
+    result = setup.deploy("reflink")
+    assert (result.strategy, result.files) == ("reflink", 2)
+    assert not same_file(*setup.pair())
+
+
+def test_copy_to_hardlink_links_every_file(setup):
+    setup.deploy("copy")
+    result = setup.deploy("hardlink")
+    assert (result.strategy, result.files) == ("hardlink", 2)
+    assert same_file(*setup.pair())
+
+
+def test_copy_leaves_steam_files_alone(setup):
+    setup.deploy("hardlink")
+    setup.deploy("copy")
+    write(setup.pair()[1], b"edited")
+    assert read(setup.pair()[0]) == b"pak"
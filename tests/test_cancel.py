@@ -0,0 +1,68 @@
+import sys
+import time
+import threading
+import subprocess
+
+import pytest
+
+import OSB_installer as O
+
+
+def sleeper(seconds):
+    return subprocess.Popen([sys.executable, "-c", f"import time; time.sleep({seconds})"])
+
+
+def test_failed_step_cancels_running_siblings(tmp_path):
+    cancel = threading.Event()
+    proc = sleeper(30)
+
+    def wait_installer():
+        O.wait_for_output(str(tmp_path / "never"), proc=proc, timeout=60, cancel=cancel)
+
+    def broken():
+        time.sleep(0.2)
+        raise RuntimeError("OSB download failed")
+
+    steps = [("wait", "Wait for installer", wait_installer, ()),
+             ("broken", "Download OSB", broken, ())]
+    started = time.monotonic()
+    try:
+        with pytest.raises(O.StepFailed) as info:
+            O.run_step_graph(steps, max_workers=4, cancel=cancel)
+    finally:
+        proc.kill()
+        proc.wait()
+    assert time.monotonic() - started < 3
+    assert isinstance(info.value.error, RuntimeError)
+
+
+def test_download_stops_when_cancelled(tmp_path, file_server):
+    server = file_server({"/big.bin": b"x" * 4_000_000}, rate=200_000)
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(O.Cancelled):
+        O.download_file(server.url("/big.bin"), str(tmp_path / "big.bin"), cancel=cancel)
+    assert time.monotonic() - started < 3
+    assert not (tmp_path / "big.bin").exists()
+
+
+def test_copy_tree_stops_when_cancelled(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(20):
+        (src / f"f{i}").write_bytes(b"data")
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(O.Cancelled):
+        O.copy_tree(str(src), str(tmp_path / "dst"), cancel=cancel)
+    assert list((tmp_path / "dst").iterdir()) == []
+
+
+def test_wait_for_output_without_process_cancels(tmp_path):
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(O.Cancelled):
+        O.wait_for_output(str(tmp_path / "out"), timeout=60, cancel=cancel)
+    assert time.monotonic() - started < 3
@@ -0,0 +1,40 @@
+import os
+
+import OSB_installer as O
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_copy_keeps_mode_and_times(tmp_path):
+    src, dst = str(tmp_path / "a.bin"), str(tmp_path / "b.bin")
+    write(src, b"data")
+    os.chmod(src, 0o640)
+    os.utime(src, ns=(1_000_000_000, 2_000_000_000))
+    assert O.copy_file_atomic(src, dst) == 4
+    st = os.stat(dst)
+    assert (st.st_mode & 0o777, st.st_mtime_ns) == (0o640, 2_000_000_000)
+
+
+def test_copy_tree_skips_files_that_already_match(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    write(os.path.join(src, "same.txt"), b"same")
+    write(os.path.join(src, "sub", "changed.txt"), b"new")
+    O.copy_tree(src, dst)
+    write(os.path.join(src, "sub", "changed.txt"), b"newer")
+
+    results = {os.path.basename(r.src): r for r in O.copy_tree(src, dst)}
+    assert results["same.txt"].size == 0
+    assert results["changed.txt"].size == 5
+    with open(os.path.join(dst, "sub", "changed.txt"), "rb") as f:
+        assert f.read() == b"newer"
+
+
+def test_copy_workers_never_exceed_cpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(O.os, "cpu_count", lambda: 1)
+    assert O.copy_workers_for(str(tmp_path)) == 1
+    monkeypatch.setattr(O.os, "cpu_count", lambda: 64)
+    assert O.copy_workers_for(str(tmp_path)) in (O.COPY_WORKERS_SSD, O.COPY_WORKERS_HDD)
@@ -0,0 +1,77 @@
+import io
+import os
+import struct
+import zipfile
+
+import pytest
+
+import OSB_installer as O
+
+
+def build_zip(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in entries:
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_update_fetches_only_changed_members(tmp_path, file_server):
+    dest = tmp_path / "osb"
+    old = build_zip([("top/win/a.dll", b"a" * 5000), ("top/win/b.dll", b"b" * 5000)])
+    new = build_zip([("top/win/a.dll", b"a" * 5000), ("top/win/b.dll", b"B" * 5000)])
+    server = file_server({"/old.zip": old, "/new.zip": new})
+
+    assert O.update_from_zip(server.url("/old.zip"), str(dest))[:2] == (2, 2)
+    changed, total, _ = O.update_from_zip(server.url("/new.zip"), str(dest))
+    assert (changed, total) == (1, 2)
+    assert (dest / "win" / "b.dll").read_bytes() == b"B" * 5000
+
+
+@pytest.mark.parametrize("name", ["top/../../escaped.txt", "/abs.txt", "top/../../../x/y.txt"])
+def test_update_rejects_members_escaping_dest(tmp_path, file_server, name):
+    dest = tmp_path / "a" / "b" / "osb"
+    dest.mkdir(parents=True)
+    data = build_zip([("top/ok.txt", b"fine"), (name, b"evil")])
+    server = file_server({"/nightly.zip": data})
+
+    with pytest.raises(ValueError):
+        O.update_from_zip(server.url("/nightly.zip"), str(dest))
+    # Nothing at all is written, not even the harmless member
+    assert os.listdir(dest) == []
+    assert not (tmp_path / "a" / "escaped.txt").exists()
+    assert not list(tmp_path.rglob("escaped.txt"))
+
+
+def as_zip64(data, comment=b"", locator=True):
+    """Rewrite a plain zip's end records the way a Zip64 writer would."""
+    pos = data.rindex(b"PK\x05\x06")
+    count, cd_size, cd_offset = struct.unpack_from("<10xHII", data, pos)
+    rec = struct.pack("<4sQHHIIQQQQ", b"PK\x06\x06", 44, 45, 45, 0, 0,
+                      count, count, cd_size, cd_offset)
+    loc = struct.pack("<4sIQI", b"PK\x06\x07", 0, pos, 1) if locator else b""
+    eocd = struct.pack("<4sHHHHIIH", b"PK\x05\x06", 0, 0, 0xFFFF, 0xFFFF,
+                       0xFFFFFFFF, 0xFFFFFFFF, len(comment))
+    return data[:pos] + rec + loc + eocd + comment
+
+
+ENTRIES = [("top/a.txt", b"a" * 3000), ("top/b.txt", b"b" * 5000)]
+
+
+@pytest.mark.parametrize("comment", [b"", b"c" * 65535], ids=["no-comment", "long-comment"])
+def test_zip64_index(tmp_path, file_server, comment):
+    data = as_zip64(build_zip(ENTRIES), comment)
+    with zipfile.ZipFile(io.BytesIO(data)) as z:  # still a valid archive
+        assert z.read("top/b.txt") == b"b" * 5000
+    server = file_server({"/big.zip": data})
+
+    members = O.read_remote_zip_index(server.url("/big.zip"))
+    assert [(m.name, m.size) for m in members] == [(n, len(d)) for n, d in ENTRIES]
+    O.update_from_zip(server.url("/big.zip"), str(tmp_path / "osb"))
+    assert (tmp_path / "osb" / "a.txt").read_bytes() == b"a" * 3000
+
+
+def test_zip64_without_locator_is_rejected(file_server):
+    server = file_server({"/big.zip": as_zip64(build_zip(ENTRIES), locator=False)})
+    with pytest.raises(ValueError, match="locator"):
+        O.read_remote_zip_index(server.url("/big.zip"))
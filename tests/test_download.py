@@ -0,0 +1,189 @@
+import os
+import time
+from urllib.error import HTTPError
+
+import pytest
+
+import OSB_installer as O
+
+BODY = os.urandom(1024 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(O, "HTTP_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(O, "HTTP_BACKOFF_CAP", 0.05)
+    monkeypatch.setattr(O, "HTTP_SEGMENT_MIN", 64 * 1024)
+
+
+def timed_download(server, dest, segments):
+    client = O.HttpClient()
+    started = time.monotonic()
+    client.download(server.url("/asset.zip"), str(dest), segments=segments)
+    return time.monotonic() - started
+
+
+def range_headers(server):
+    return [h["Range"] for method, _, h in server.requests if "Range" in h]
+
+
+def test_segments_beat_per_connection_bandwidth_limit(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, rate=1024 * 1024)
+    single = timed_download(server, tmp_path / "single.zip", segments=1)
+    split = timed_download(server, tmp_path / "split.zip", segments=4)
+
+    assert (tmp_path / "single.zip").read_bytes() == BODY
+    assert (tmp_path / "split.zip").read_bytes() == BODY
+    assert single > 0.9  # 1 MiB at 1 MiB/s
+    assert split < single * 0.6
+    assert set(range_headers(server)[-4:]) == {
+        f"bytes={i * len(BODY) // 4}-{(i + 1) * len(BODY) // 4 - 1}" for i in range(4)}
+
+
+def test_keep_alive_connections_are_reused(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY[:4096]})
+    client = O.HttpClient()
+    for i in range(3):
+        client.download(server.url("/asset.zip"), str(tmp_path / f"{i}.zip"))
+    assert len(server.requests) == 6  # probe + body each time
+    assert len(server.peers) == 1
+
+
+def test_no_range_server_restarts_after_a_drop(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, ranges=False, drop_after=300_000,
+                         drops=2, rate=4 * 1024 * 1024)
+    dest = tmp_path / "asset.zip"
+    O.HttpClient().download(server.url("/asset.zip"), str(dest), segments=4)
+    assert dest.read_bytes() == BODY
+    assert len(server.requests) == 3
+    assert not (tmp_path / "asset.zip.part").exists()
+
+
+def test_no_range_server_gives_up_after_retries(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, ranges=False, drop_after=1000, drops=10)
+    client = O.HttpClient(retries=2)
+    with pytest.raises(ConnectionError):
+        client.download(server.url("/asset.zip"), str(tmp_path / "asset.zip"))
+    assert len(server.requests) == 3
+    assert not (tmp_path / "asset.zip").exists()
+
+
+def test_client_error_in_segment_is_not_retried(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, errors={1: 403})
+    with pytest.raises(HTTPError) as info:
+        O.HttpClient().download(server.url("/asset.zip"), str(tmp_path / "a.zip"))
+    assert info.value.code == 403
+    assert len(server.requests) == 2
+
+
+def test_server_error_in_segment_is_retried(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, errors={1: 503, 2: 502})
+    dest = tmp_path / "asset.zip"
+    O.HttpClient().download(server.url("/asset.zip"), str(dest))
+    assert dest.read_bytes() == BODY
+    assert len(server.requests) == 4
+
+
+def test_not_modified_is_raised(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY})
+    meta = {}
+    client = O.HttpClient()
+    client.download(server.url("/asset.zip"), str(tmp_path / "a.zip"), meta=meta)
+    with pytest.raises(HTTPError) as info:
+        client.download(server.url("/asset.zip"), str(tmp_path / "b.zip"),
+                        headers={"If-None-Match": meta["etag"]})
+    assert info.value.code == 304
+
+
+def test_range_download_resumes_after_a_drop(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, drop_after=300_000, drops=1)
+    dest = tmp_path / "asset.zip"
+    seen = []
+    O.download_file(server.url("/asset.zip"), str(dest),
+                    progress=lambda done, total: seen.append((done, total)))
+    assert dest.read_bytes() == BODY
+    # Probe, the dropped stream, then a resume from where it stopped
+    ranges = range_headers(server)
+    assert ranges[:2] == ["bytes=0-0", f"bytes=0-{len(BODY) - 1}"]
+    assert len(ranges) == 3
+    resumed_at = int(ranges[2].split("=")[1].split("-")[0])
+    assert resumed_at >= 300_000
+    assert [done for done, _ in seen] == sorted(done for done, _ in seen)
+    assert seen[-1] == (len(BODY), len(BODY))
+
+
+def test_segmented_download_resumes_every_dropped_segment(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, drop_after=50_000, drops=4)
+    dest = tmp_path / "asset.zip"
+    O.download_file(server.url("/asset.zip"), str(dest), segments=4)
+    assert dest.read_bytes() == BODY
+    assert len(range_headers(server)) == 1 + 4 + 4
+
+
+def test_plain_download_starts_over_after_a_drop(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, ranges=False, drop_after=300_000, drops=1)
+    dest = tmp_path / "asset.zip"
+    seen = []
+    O.download_file(server.url("/asset.zip"), str(dest),
+                    progress=lambda done, total: seen.append(done))
+    assert dest.read_bytes() == BODY
+    assert len(server.requests) == 2
+    restart = next(i for i in range(1, len(seen)) if seen[i] < seen[i - 1])
+    assert 0 < seen[restart - 1] <= 300_000
+    assert seen[-1] == len(BODY)
+
+
+def test_cache_fetch_survives_drops(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY}, drop_after=100_000, drops=2)
+    cache = O.DownloadCache(root=str(tmp_path / "cache"))
+    path = cache.fetch(server.url("/asset.zip"))
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert not [n for n in os.listdir(tmp_path / "cache") if n.startswith("incoming")]
+
+
+def test_cache_reuses_blob_on_not_modified(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY})
+    cache = O.DownloadCache(root=str(tmp_path / "cache"))
+    first = cache.fetch(server.url("/asset.zip"))
+    written = os.stat(first).st_mtime_ns
+    etag = cache.lookup(server.url("/asset.zip"))["etag"]
+
+    sent = len(server.requests)
+    assert cache.fetch(server.url("/asset.zip")) == first
+    revalidation = server.requests[sent:]
+    assert [h.get("If-None-Match") for _, _, h in revalidation] == [etag]
+    assert os.stat(first).st_mtime_ns == written
+
+
+def test_cache_serves_stale_copy_when_offline(tmp_path, file_server):
+    server = file_server({"/asset.zip": BODY})
+    url = server.url("/asset.zip")
+    cache = O.DownloadCache(root=str(tmp_path / "cache"))
+    path = cache.fetch(url)
+    server.close()
+
+    # A fresh cache object reads the same index from disk
+    assert O.DownloadCache(root=str(tmp_path / "cache")).fetch(url) == path
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    with pytest.raises(OSError):
+        cache.fetch(url.replace("asset.zip", "other.zip"))
+
+
+def test_cache_evicts_least_recently_used(tmp_path, file_server):
+    size = 100_000
+    bodies = {f"/{name}.zip": os.urandom(size) for name in "abc"}
+    server = file_server(bodies)
+    cache = O.DownloadCache(root=str(tmp_path / "cache"), max_bytes=size * 5 // 2)
+    a = cache.fetch(server.url("/a.zip"))
+    b = cache.fetch(server.url("/b.zip"))
+    assert cache.fetch(server.url("/a.zip")) == a  # a is now more recent than b
+    c = cache.fetch(server.url("/c.zip"))
+
+    assert os.path.isfile(a) and os.path.isfile(c)
+    assert not os.path.exists(b)
+    assert cache.lookup(server.url("/b.zip")) is None
+    # The trimmed index is what a later run sees
+    assert sorted(O.DownloadCache(root=str(tmp_path / "cache")).index) == sorted(
+        server.url(p) for p in ("/a.zip", "/c.zip"))
@@ -0,0 +1,54 @@
+import os
+import zipfile
+
+import pytest
+
+import OSB_installer as O
+
+
+def make_zip(path, entries, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression) as z:
+        for name, data in entries:
+            z.writestr(name, data)
+    return str(path)
+
+
+def test_extract_round_trip(tmp_path):
+    entries = [("win/starbound.exe", os.urandom(300_000)), ("assets/user/", b""),
+               ("mods/readme.txt", b"hello")]
+    archive = make_zip(tmp_path / "a.zip", entries)
+    seen = []
+    dest = tmp_path / "out"
+    assert O.extract_archive(archive, str(dest), progress=lambda *a: seen.append(a)) == 2
+    assert (dest / "win" / "starbound.exe").read_bytes() == entries[0][1]
+    assert (dest / "mods" / "readme.txt").read_bytes() == b"hello"
+    assert (dest / "assets" / "user").is_dir()
+    assert sorted(done for _, done, total in seen) == [1, 2]
+
+
+@pytest.mark.parametrize("name", ["../escaped.txt", "win/../../escaped.txt", "..\\escaped.txt",
+                                  "/abs.txt", "\\abs.txt", "C:/abs.txt"])
+def test_extract_rejects_members_escaping_dest(tmp_path, name):
+    archive = make_zip(tmp_path / "evil.zip", [("ok.txt", b"fine"), (name, b"evil")])
+    dest = tmp_path / "a" / "out"
+    with pytest.raises(ValueError):
+        O.extract_archive(archive, str(dest))
+    # Names are checked before anything is written
+    assert not dest.exists()
+    assert not list(tmp_path.rglob("escaped.txt"))
+    assert not list(tmp_path.rglob("abs.txt"))
+
+
+def test_extract_rejects_corrupted_member(tmp_path):
+    good = os.urandom(50_000)
+    payload = b"A" * 50_000
+    archive = tmp_path / "bad.zip"
+    make_zip(archive, [("good.bin", good), ("bad.bin", payload)], zipfile.ZIP_STORED)
+    data = archive.read_bytes()
+    at = data.index(payload) + 25_000
+    archive.write_bytes(data[:at] + b"B" + data[at + 1:])
+
+    dest = tmp_path / "out"
+    with pytest.raises(zipfile.BadZipFile, match="CRC"):
+        O.extract_archive(str(archive), str(dest))
+    assert not (dest / "bad.bin").exists()
@@ -0,0 +1,70 @@
+import os
+
+import OSB_installer as O
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def make_primary(tmp_path):
+    steam = str(tmp_path / "Steam" / "assets")
+    osb = str(tmp_path / "OpenStarbound")
+    write(os.path.join(steam, "packed.pak"), b"v1")
+    write(os.path.join(osb, "win", "starbound.exe"), b"MZ")
+    write(os.path.join(osb, "storage", "player.dat"), b"primary save")
+    sbinit = os.path.join(osb, "win", "sbinit.config")
+    O.deploy_assets(steam, os.path.join(osb, "assets"), sbinit, "copy")
+    return steam, osb, sbinit
+
+
+def test_resyncing_the_primary_leaves_fleet_folders_alone(tmp_path):
+    steam, osb, sbinit = make_primary(tmp_path)
+    target = str(tmp_path / "fleet" / "server2")
+    O.replicate_install(osb, target)
+    shared = os.path.join(target, "assets", "packed.pak")
+    assert os.stat(shared).st_nlink == 2  # linked to the primary
+
+    write(os.path.join(steam, "packed.pak"), b"v2")
+    result = O.deploy_assets(steam, os.path.join(osb, "assets"), sbinit, "copy")
+    assert result.files == 1
+    assert read(os.path.join(osb, "assets", "packed.pak")) == b"v2"
+    assert read(shared) == b"v1"  # untouched until the fleet step runs
+
+    assert O.replicate_install(osb, target) == (2, 0)  # the pak and its sync manifest
+    assert read(shared) == b"v2"
+
+
+def test_replicate_skips_private_folders_and_removes_stale_files(tmp_path):
+    steam, osb, sbinit = make_primary(tmp_path)
+    target = str(tmp_path / "fleet" / "server2")
+    write(os.path.join(target, "storage", "player.dat"), b"target save")
+    write(os.path.join(osb, "mods", "old.pak"), b"old")
+    O.replicate_install(osb, target)
+    assert read(os.path.join(target, "storage", "player.dat")) == b"target save"
+    assert read(os.path.join(target, "mods", "old.pak")) == b"old"
+
+    os.remove(os.path.join(osb, "mods", "old.pak"))
+    assert O.replicate_install(osb, target) == (0, 1)
+    assert not os.path.exists(os.path.join(target, "mods", "old.pak"))
+
+
+def test_sync_tree_replaces_instead_of_writing_into_targets(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    write(os.path.join(src, "a.txt"), b"one")
+    manifest = str(tmp_path / "m.json")
+    O.sync_tree(src, dst, manifest)
+    other = str(tmp_path / "other.txt")
+    os.link(os.path.join(dst, "a.txt"), other)
+
+    write(os.path.join(src, "a.txt"), b"two!")
+    assert O.sync_tree(src, dst, manifest) == (1, 0)
+    assert read(os.path.join(dst, "a.txt")) == b"two!"
+    assert read(other) == b"one"
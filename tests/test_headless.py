@@ -0,0 +1,42 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NO_TK = "import sys; sys.modules['tkinter'] = None; "
+
+
+def run_python(code, cwd):
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_engine_imports_without_tkinter(tmp_path):
+    out = run_python(NO_TK + f"sys.path.insert(0, {REPO_DIR!r}); "
+                     "import OSB_installer as O; print(O.InstallEngine.__name__); "
+                     "print('tkinter' in sys.modules and sys.modules['tkinter'] is not None)",
+                     tmp_path)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["InstallEngine", "False"]
+
+
+def test_headless_cli_runs_without_tkinter(tmp_path):
+    script = os.path.join(REPO_DIR, "OSB_installer.py")
+    missing = str(tmp_path / "missing")
+    out = run_python(NO_TK + "import runpy; "
+                     f"sys.argv = [{script!r}, '--update-only', '--osb-dir', {missing!r}]; "
+                     f"runpy.run_path({script!r}, run_name='__main__')",
+                     tmp_path)
+    assert out.returncode == 1, out.stderr
+    assert "No OpenStarbound install at" in out.stderr
+    assert "Update OSB from nightly build" in out.stdout
+
+
+def test_wizard_shares_the_engine_module():
+    pytest.importorskip("tkinter")
+    import OSB_installer
+    import osb_wizard
+
+    assert osb_wizard.InstallEngine is OSB_installer.InstallEngine
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+import OSB_installer as O
+
+STEPS = ["steamcmd", "starbound", "installer", "merge", "assets", "deploy", "final"]
+JOURNALED = ["steamcmd", "starbound", "installer", "merge", "assets"]
+
+
+class FakeInstall:
+    """
+    Drives a real InstallEngine (steps, journal, --force) with every step
+    replaced by a stand-in that leaves behind what step_inputs checks for.
+    A step named in `fail` raises instead, after doing nothing.
+    """
+
+    def __init__(self, root):
+        self.root     = root
+        self.sb_dir   = os.path.join(root, "Starbound")
+        self.osb_dir  = os.path.join(root, "OpenStarbound")
+        self.tag      = "v0.1.14"
+        self.journal  = os.path.join(root, "install_journal.json")
+        os.makedirs(os.path.join(self.sb_dir, "assets"), exist_ok=True)
+        with open(os.path.join(self.sb_dir, "assets", "packed.pak"), "wb") as f:
+            f.write(b"assets")
+
+    def run(self, fail=(), force=()):
+        engine = O.InstallEngine(steam_dir=self.sb_dir, install_dir=self.sb_dir,
+                                 osb_dirs=[self.osb_dir], force=force,
+                                 steam_client=False, log=lambda txt: None)
+        engine.journal = O.InstallJournal(self.journal)
+        engine.latest_tag = lambda: self.tag
+        engine.mod_details = lambda: None
+        calls = []
+
+        def fake(name, output=None):
+            def step():
+                calls.append(name)
+                if name in fail:
+                    raise OSError(f"injected failure in {name}")
+                if name == "merge":
+                    assert engine.installer_proc == "proc", "merge ran without the installer"
+                if name == "installer":
+                    engine.installer_proc = "proc"
+                if output:
+                    os.makedirs(os.path.dirname(output), exist_ok=True)
+                    with open(output, "wb") as f:
+                        f.write(b"exe")
+            return step
+
+        engine._step_steamcmd = fake("steamcmd", os.path.join(os.getcwd(), "steamcmd", "steamcmd.exe"))
+        engine._step_starbound = fake("starbound", os.path.join(self.sb_dir, "starbound.exe"))
+        engine._step_installer_release = fake("installer")
+        engine._step_merge_osb_output = fake("merge", os.path.join(self.osb_dir, "win", "starbound.exe"))
+        engine._step_assets = fake("assets")
+        engine._step_deploy_mods = fake("deploy")
+        engine._step_final_osb_copy = fake("final")
+        engine.run()
+        return calls
+
+
+@pytest.fixture
+def install(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return FakeInstall(str(tmp_path))
+
+
+def test_clean_rerun_skips_journaled_steps(install):
+    assert sorted(install.run()) == sorted(STEPS)
+    assert sorted(install.run()) == ["deploy", "final"]
+
+
+@pytest.mark.parametrize("failing", STEPS)
+def test_failed_step_resumes_where_it_stopped(install, failing):
+    calls = []
+    with pytest.raises(O.StepFailed) as info:
+        calls = install.run(fail={failing})
+    assert failing in str(info.value.error)
+
+    recorded = set(O.InstallJournal(install.journal).entries)
+    assert failing not in recorded
+    # The installer only counts as done once its output has been merged
+    assert ("installer" in recorded) == ("merge" in recorded)
+
+    rerun = install.run()
+    assert failing in rerun
+    assert not recorded & set(rerun)
+    assert set(rerun) | recorded == set(STEPS)
+    assert sorted(install.run()) == ["deploy", "final"]
+
+
+def test_changed_input_reruns_step_and_dependents(install):
+    install.run()
+    install.tag = "v0.1.15"
+    assert sorted(install.run()) == ["assets", "deploy", "final", "installer", "merge"]
+
+
+def test_deleted_output_reruns_step(install):
+    install.run()
+    os.remove(os.path.join(install.sb_dir, "starbound.exe"))
+    assert sorted(install.run()) == ["assets", "deploy", "final", "starbound"]
+
+
+@pytest.mark.parametrize("force, expected", [
+    ({"steamcmd"}, ["assets", "deploy", "final", "starbound", "steamcmd"]),
+    ({"installer"}, ["assets", "deploy", "final", "installer", "merge"]),
+    # merge needs a fresh installer run to have anything to merge
+    ({"merge"}, ["assets", "deploy", "final", "installer", "merge"]),
+    ({"assets"}, ["assets", "deploy", "final"]),
+    ({"all"}, sorted(STEPS)),
+])
+def test_force_reruns_step(install, force, expected):
+    install.run()
+    assert sorted(install.run(force=force)) == expected
@@ -0,0 +1,90 @@
+import os
+import json
+
+import pytest
+
+import OSB_installer as O
+
+METADATA = {
+    "name": "testmod",
+    "friendlyName": "Test Mod",
+    "priority": -12.5,
+    "version": 3,
+    "includes": ["base", "other"],
+    "tags": {"enabled": True, "nothing": None},
+}
+
+
+def unpack(pak):
+    metadata, index = O.read_pak(pak)
+    return metadata, {name: O.read_pak_asset(pak, entry) for name, entry in index.items()}
+
+
+def make_mod(root, files, metadata=None):
+    for rel, data in files.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    if metadata is not None:
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, "_metadata"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+
+def test_pak_round_trip(tmp_path):
+    files = {
+        "items/sword.activeitem": b'{"itemName": "sword"}',
+        "items/empty.config": b"",
+        "sfx/noise.ogg": os.urandom(200_000),
+        "café/ünicode.png": b"\x89PNG\r\n",
+    }
+    src = tmp_path / "mod"
+    make_mod(str(src), files, METADATA)
+    pak = str(tmp_path / "mod.pak")
+
+    assert O.pack_directory(str(src), pak) == len(files)
+    metadata, assets = unpack(pak)
+    assert metadata == METADATA
+    assert assets == {"/" + rel: data for rel, data in files.items()}
+
+
+def test_empty_mod_round_trip(tmp_path):
+    src = tmp_path / "mod"
+    src.mkdir()
+    pak = str(tmp_path / "empty.pak")
+    assert O.pack_directory(str(src), pak) == 0
+    assert unpack(pak) == ({}, {})
+
+
+def test_metadata_only_mod(tmp_path):
+    src = tmp_path / "mod"
+    make_mod(str(src), {}, {"name": "meta"})
+    pak = str(tmp_path / "meta.pak")
+    assert O.pack_directory(str(src), pak) == 0
+    assert unpack(pak) == ({"name": "meta"}, {})
+
+
+def test_commented_metadata_is_left_out(tmp_path):
+    src = tmp_path / "mod"
+    make_mod(str(src), {"a.txt": b"a", "_metadata": b'{ // comment\n "name": "x" }'})
+    pak = str(tmp_path / "mod.pak")
+    O.pack_directory(str(src), pak)
+    assert unpack(pak) == ({}, {"/a.txt": b"a"})
+
+
+def test_read_pak_rejects_other_files(tmp_path):
+    path = tmp_path / "not.pak"
+    path.write_bytes(b"PK\x03\x04" + b"\0" * 40)
+    with pytest.raises(ValueError):
+        O.read_pak(str(path))
+
+
+def test_deploy_mod_packs_once(tmp_path):
+    item = tmp_path / "3534616750"
+    make_mod(str(item), {"a.txt": b"a"}, {"name": "m"})
+    mods = tmp_path / "mods"
+    mods.mkdir()
+    assert O.deploy_mod(str(item), str(mods), "workshop-3534616750") == "packed"
+    assert O.deploy_mod(str(item), str(mods), "workshop-3534616750") == "unchanged"
+    assert unpack(str(mods / "workshop-3534616750.pak")) == ({"name": "m"}, {"/a.txt": b"a"})
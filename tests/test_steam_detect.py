@@ -0,0 +1,122 @@
+import os
+import json
+
+import pytest
+
+import OSB_installer as O
+
+
+class Machine:
+    """A fake Steam setup: one registered library plus some drive letters."""
+
+    def __init__(self, root, monkeypatch):
+        self.root   = root
+        self.steam  = os.path.join(root, "Steam")
+        self.drives = [os.path.join(root, "C") + os.sep, os.path.join(root, "D") + os.sep]
+        self.scans  = 0
+        self.index_path = os.path.join(root, "steam_index.json")
+        for drive in self.drives:
+            os.makedirs(drive)
+        self.write_libraries()
+
+        real_scan = O.scan_drives
+
+        def scan_drives(drives):
+            self.scans += 1
+            return real_scan(drives)
+
+        monkeypatch.setattr(O, "STEAM_INDEX_PATH", self.index_path)
+        monkeypatch.setattr(O, "steam_roots", lambda: [self.steam])
+        monkeypatch.setattr(O, "list_drives", lambda: list(self.drives))
+        monkeypatch.setattr(O, "scan_drives", scan_drives)
+
+    @property
+    def vdf(self):
+        return os.path.join(self.steam, "steamapps", "libraryfolders.vdf")
+
+    def write_libraries(self, apps=("228980",)):
+        os.makedirs(os.path.dirname(self.vdf), exist_ok=True)
+        app_lines = "".join(f'\t\t\t"{a}"\t\t"1"\n' for a in apps)
+        with open(self.vdf, "w", encoding="utf-8") as f:
+            f.write('"libraryfolders"\n{\n\t"0"\n\t{\n'
+                    f'\t\t"path"\t\t"{self.steam}"\n\t\t"apps"\n\t\t{{\n{app_lines}\t\t}}\n'
+                    "\t}\n}\n")
+
+    def install_on_drive(self, drive):
+        folder = os.path.join(drive, "SteamLibrary", "steamapps", "common", "Starbound")
+        os.makedirs(folder)
+        with open(os.path.join(folder, "starbound.exe"), "wb") as f:
+            f.write(b"MZ")
+        return folder
+
+
+@pytest.fixture
+def machine(tmp_path, monkeypatch):
+    return Machine(str(tmp_path), monkeypatch)
+
+
+def test_not_found_is_cached(machine):
+    assert O.detect_starbound_install() == ""
+    assert machine.scans == 1
+    with open(machine.index_path, encoding="utf-8") as f:
+        assert json.load(f)["starbound"] == ""
+
+    for _ in range(3):
+        assert O.detect_starbound_install() == ""
+        assert O.get_steam_libraries() == [machine.steam]
+    assert machine.scans == 1
+
+
+def test_fallback_result_is_cached(machine):
+    found = machine.install_on_drive(machine.drives[1])
+    assert O.detect_starbound_install() == found
+    assert O.detect_starbound_install() == found
+    assert machine.scans == 1
+
+
+def test_changed_vdf_invalidates_cached_result(machine):
+    O.detect_starbound_install()
+    found = machine.install_on_drive(machine.drives[0])
+    assert O.detect_starbound_install() == ""  # still cached
+    machine.write_libraries(apps=("228980", "620"))
+    os.utime(machine.vdf, ns=(1, 1))
+    assert O.detect_starbound_install() == found
+    assert machine.scans == 2
+
+
+def test_new_drive_invalidates_cached_result(machine):
+    O.detect_starbound_install()
+    drive = os.path.join(machine.root, "E") + os.sep
+    os.makedirs(drive)
+    found = machine.install_on_drive(drive)
+    machine.drives.append(drive)
+    assert O.detect_starbound_install() == found
+    assert machine.scans == 2
+
+
+def test_removed_install_is_rescanned(machine):
+    found = machine.install_on_drive(machine.drives[0])
+    assert O.detect_starbound_install() == found
+    os.remove(os.path.join(found, "starbound.exe"))
+    assert O.detect_starbound_install() == ""
+    assert machine.scans == 2
+
+
+def test_library_install_skips_the_drive_scan(machine):
+    machine.write_libraries(apps=(O.STARBOUND_APP_ID,))
+    common = os.path.join(machine.steam, "steamapps", "common", "Starbound")
+    os.makedirs(common)
+    with open(os.path.join(common, "starbound.exe"), "wb") as f:
+        f.write(b"MZ")
+    with open(os.path.join(machine.steam, "steamapps",
+                           f"appmanifest_{O.STARBOUND_APP_ID}.acf"), "w") as f:
+        f.write('"AppState"\n{\n\t"installdir"\t\t"Starbound"\n}\n')
+    assert O.detect_starbound_install() == common
+    assert machine.scans == 0
+
+
+def test_one_index_serves_both_lookups(machine, monkeypatch):
+    index = O.steam_index()
+    monkeypatch.setattr(O, "steam_index", lambda rescan=False: pytest.fail("index reloaded"))
+    assert O.get_steam_libraries(index) == [machine.steam]
+    assert O.detect_starbound_install(index) == ""
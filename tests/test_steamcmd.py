@@ -0,0 +1,183 @@
+import os
+import time
+import threading
+import subprocess
+
+import pytest
+
+import OSB_installer as O
+from fake_steamcmd import APP_SIZE
+
+E = O.SteamCmdEvent
+
+
+@pytest.mark.parametrize("line, event", [
+    (" Update state (0x61) downloading, progress: 45.12 (1234567 / 2736482)",
+     E("progress", None, "downloading", 1234567, 2736482, None, None)),
+    (" Update state (0x81) verifying update, progress: 100.00 (10 / 10)",
+     E("progress", None, "verifying update", 10, 10, None, None)),
+    ("Downloading item 3534616750 ...",
+     E("item_start", "3534616750", None, None, None, None, None)),
+    ('Success. Downloaded item 3534616750 to "C:\\x\\3534616750" (4800000 bytes) ',
+     E("item_done", "3534616750", None, 4800000, 4800000, None, None)),
+    ("ERROR! Download item 111 failed (Failure).",
+     E("item_failed", "111", "Failure", None, None, None, None)),
+    ("ERROR! Timeout downloading item 222",
+     E("item_failed", "222", "Timeout", None, None, None, None)),
+    ("Success! App '211820' fully installed.",
+     E("app_done", "211820", None, None, None, None, None)),
+    ("Error! App '211820' state is 0x202 after update job.",
+     E("app_failed", "211820", "0x202", None, None, None, None)),
+    ("Loading Steam API...OK", None),
+    ("[  0%] Checking for available updates...", None),
+])
+def test_parse_steamcmd_line(line, event):
+    assert O.parse_steamcmd_line(line) == event
+
+
+def write_script(tmp_path, items=("3534616750", "111"), app=True):
+    path = tmp_path / "script.txt"
+    path.write_text(O.steamcmd_script(str(tmp_path / "sb"), O.STARBOUND_APP_ID if app else None,
+                                      workshop_items=items))
+    return str(path)
+
+
+def test_run_steamcmd_streams_events(tmp_path, fake_steamcmd):
+    events = []
+    O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)), on_event=events.append)
+
+    kinds = [e.kind for e in events]
+    assert kinds == ["progress"] * 6 + ["app_done", "item_start", "item_done",
+                                        "item_start", "item_failed"]
+    progress = [e for e in events if e.kind == "progress"]
+    # \r-terminated lines arrive one by one, and the meter fills in rate/ETA
+    assert [e.done for e in progress[1:5]] == [APP_SIZE * i // 8 for i in range(1, 5)]
+    assert progress[0].state == "reconfiguring"
+    assert progress[2].rate and progress[2].eta is not None
+    assert events[-1] == E("item_failed", "111", "Failure", None, None, None, None)
+    assert len(fake_steamcmd.runs()) == 1
+
+
+def test_stalled_session_is_killed_and_retried(tmp_path, fake_steamcmd, monkeypatch):
+    monkeypatch.setenv("FAKE_STEAMCMD_STALL", "1")
+    events = []
+    started = time.monotonic()
+    O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)), on_event=events.append,
+                   stall_timeout=1, retries=2)
+    assert time.monotonic() - started < 15
+
+    runs = fake_steamcmd.runs()
+    assert len(runs) == 2
+    with pytest.raises(ProcessLookupError):
+        os.kill(runs[0]["pid"], 0)  # the stalled one was killed and reaped
+    retries = [e for e in events if e.kind == "retry"]
+    assert retries == [E("retry", None, None, 1, 2, None, None)]
+    # The second attempt ran to the end
+    assert events[-1].kind == "item_failed"
+    assert [e.kind for e in events].count("app_done") == 1
+
+
+def test_every_attempt_stalling_raises(tmp_path, fake_steamcmd, monkeypatch):
+    monkeypatch.setenv("FAKE_STEAMCMD_STALL", "5")
+    events = []
+    with pytest.raises(TimeoutError):
+        O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)), on_event=events.append,
+                       stall_timeout=1, retries=1)
+    assert len(fake_steamcmd.runs()) == 2
+    assert [e.done for e in events if e.kind == "retry"] == [1]
+
+
+def test_progress_keeps_a_slow_session_alive(tmp_path, fake_steamcmd):
+    # Lines keep arriving faster than the stall timeout, so nothing is killed
+    O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)), stall_timeout=0.5)
+    assert len(fake_steamcmd.runs()) == 1
+
+
+def test_failed_exit_raises(tmp_path, fake_steamcmd, monkeypatch):
+    monkeypatch.setenv("FAKE_STEAMCMD_EXIT", "8")
+    with pytest.raises(subprocess.CalledProcessError) as info:
+        O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)))
+    assert info.value.returncode == 8
+    assert len(fake_steamcmd.runs()) == 1
+
+
+def test_cancel_kills_steamcmd(tmp_path, fake_steamcmd, monkeypatch):
+    monkeypatch.setenv("FAKE_STEAMCMD_STALL", "1")
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(O.Cancelled):
+        O.run_steamcmd(fake_steamcmd.args(write_script(tmp_path)), cancel=cancel)
+    assert time.monotonic() - started < 5
+    with pytest.raises(ProcessLookupError):
+        os.kill(fake_steamcmd.runs()[0]["pid"], 0)
+
+
+def script_lines(run):
+    return [line for line in run["script"].splitlines() if line]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the fake steamcmd.exe is a shell wrapper")
+@pytest.mark.parametrize("validate", [True, False])
+def test_batch_runs_one_session(tmp_path, fake_steamcmd, validate):
+    install_dir = str(tmp_path / "Starbound")
+    items = ["3534616750", "2", "3", "2"]
+    O.run_steamcmd_batch(fake_steamcmd.exe, install_dir, items, sessions=1, validate=validate)
+
+    runs = fake_steamcmd.runs()
+    assert len(runs) == 1
+    assert runs[0]["argv"][0] == "+runscript"
+    lines = script_lines(runs[0])
+    assert lines.index(f'force_install_dir "{install_dir}"') < lines.index("login anonymous")
+    assert lines.count("login anonymous") == 1
+    app = [line for line in lines if line.startswith("app_update")]
+    assert app == [f"app_update {O.STARBOUND_APP_ID}" + (" validate" if validate else "")]
+    assert [line for line in lines if line.startswith("workshop_download_item")] == [
+        f"workshop_download_item {O.STARBOUND_APP_ID} {i}" for i in ("3534616750", "2", "3")]
+    assert lines[-1] == "quit"
+    # The runscript is cleaned up afterwards
+    assert not os.path.exists(runs[0]["argv"][1])
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the fake steamcmd.exe is a shell wrapper")
+def test_batch_splits_items_across_sessions(tmp_path, fake_steamcmd):
+    items = [str(1000 + i) for i in range(7)]
+    events = []
+    O.run_steamcmd_batch(fake_steamcmd.exe, str(tmp_path / "Starbound"), items, sessions=3,
+                         on_event=lambda session, event: events.append((session, event)))
+
+    runs = fake_steamcmd.runs()
+    assert len(runs) == 3
+    assert len({run["pid"] for run in runs}) == 3
+    per_run = [[line.split()[-1] for line in script_lines(run)
+                if line.startswith("workshop_download_item")] for run in runs]
+    assert sorted(len(p) for p in per_run) == [2, 2, 3]
+    assert sorted(i for p in per_run for i in p) == items
+    # Only one session installs the game
+    assert sum(any(line.startswith("app_update") for line in script_lines(run))
+               for run in runs) == 1
+    done = {}
+    for session, event in events:
+        if event.kind == "item_done":
+            done.setdefault(session, set()).add(event.item)
+    assert sorted(map(sorted, done.values())) == sorted(map(sorted, per_run))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the fake steamcmd.exe is a shell wrapper")
+def test_batch_without_install_dir_only_downloads_items(fake_steamcmd):
+    O.run_steamcmd_batch(fake_steamcmd.exe, None, ["5", "6"], sessions=4)
+
+    runs = fake_steamcmd.runs()
+    assert len(runs) == 2  # never more sessions than items
+    for run in runs:
+        lines = script_lines(run)
+        assert not [line for line in lines
+                    if line.startswith(("force_install_dir", "app_update"))]
+        assert lines.count("login anonymous") == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the fake steamcmd.exe is a shell wrapper")
+def test_batch_uses_configured_session_count(tmp_path, fake_steamcmd):
+    O.run_steamcmd_batch(fake_steamcmd.exe, str(tmp_path / "Starbound"),
+                         [str(i) for i in range(10)])
+    assert len(fake_steamcmd.runs()) == O.STEAMCMD_SESSIONS
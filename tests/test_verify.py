@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import OSB_installer as O
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class Engine:
+    """A real InstallEngine pointed at tmp_path with SteamCMD replaced."""
+
+    def __init__(self, root, monkeypatch):
+        self.install_dir = os.path.join(root, "Starbound")
+        self.validates   = []
+        monkeypatch.setattr(O, "BASELINE_PATH", os.path.join(root, "baseline.json"))
+        monkeypatch.setattr(O, "run_steamcmd_batch", self.steamcmd)
+        self.engine = O.InstallEngine(steam_dir=os.path.join(root, "missing"),
+                                      install_dir=self.install_dir,
+                                      osb_dirs=[os.path.join(root, "OpenStarbound")],
+                                      steam_client=False, log=lambda txt: None)
+        self.engine.hashes = O.HashCache(os.path.join(root, "hash_cache.json"))
+        self.engine.mod_details = lambda: None
+
+    def steamcmd(self, exe, install_dir, items, validate=False, **kwargs):
+        self.validates.append(validate)
+        self.write("starbound.exe", b"MZ")
+        self.write("assets/packed.pak", b"pak")
+        self.write(f"steamapps/appmanifest_{O.STARBOUND_APP_ID}.acf", b"manifest")
+
+    def write(self, rel, data):
+        write(os.path.join(self.install_dir, *rel.split("/")), data)
+
+    def run(self):
+        self.engine.steam_dir = os.path.join(os.path.dirname(self.install_dir), "missing")
+        self.engine._step_starbound()
+        return self.validates[-1]
+
+
+def test_baseline_leaves_out_run_time_folders(tmp_path, monkeypatch):
+    run = Engine(str(tmp_path), monkeypatch)
+    assert run.run() is True  # no baseline yet
+    assert sorted(O.load_baseline(run.install_dir)) == ["assets/packed.pak", "starbound.exe"]
+
+    run.write("storage/universe/world.dat", b"world")
+    run.write("logs/starbound.log", b"log")
+    run.write("steamapps/workshop/content/211820/1/mod.pak", b"mod")
+    run.write(f"steamapps/appmanifest_{O.STARBOUND_APP_ID}.acf", b"rewritten")
+    assert run.run() is False
+
+    run.write("assets/packed.pak", b"damaged")
+    assert run.run() is True
+
+
+def test_old_baseline_entries_for_run_time_folders_are_ignored(tmp_path, monkeypatch):
+    run = Engine(str(tmp_path), monkeypatch)
+    run.run()
+    digests = O.load_baseline(run.install_dir)
+    digests["storage/starbound.config"] = "0" * 32
+    O.save_baseline(run.install_dir, digests)
+    assert run.run() is False
+
+
+class NoHashing:
+    def __getattr__(self, name):
+        pytest.fail(f"assets were hashed ({name})")
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "sbinit"])
+def test_linked_assets_are_not_verified(tmp_path, mode):
+    steam = str(tmp_path / "Steam")
+    write(os.path.join(steam, "assets", "packed.pak"), b"pak")
+    engine = O.InstallEngine(steam_dir=steam, osb_dirs=[str(tmp_path / "OpenStarbound")],
+                             asset_mode=mode, steam_client=False, log=lambda txt: None)
+    engine.hashes = NoHashing()
+    engine._step_assets()
+
+
+def test_copied_assets_are_verified_and_repaired(tmp_path, monkeypatch):
+    steam = str(tmp_path / "Steam")
+    write(os.path.join(steam, "assets", "packed.pak"), b"pak")
+    osb = str(tmp_path / "OpenStarbound")
+    engine = O.InstallEngine(steam_dir=steam, osb_dirs=[osb], asset_mode="copy",
+                             steam_client=False, log=lambda txt: None)
+    engine.hashes = O.HashCache(str(tmp_path / "hash_cache.json"))
+    real_sync = O.sync_tree
+
+    def corrupting_sync(src, dst, manifest_path, **kwargs):
+        result = real_sync(src, dst, manifest_path, **kwargs)
+        target = os.path.join(dst, "packed.pak")
+        st = os.stat(target)
+        with open(target, "r+b") as f:
+            f.write(b"bad")
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        monkeypatch.setattr(O, "sync_tree", real_sync)
+        return result
+
+    monkeypatch.setattr(O, "sync_tree", corrupting_sync)
+    engine._step_assets()
+    with open(os.path.join(osb, "assets", "packed.pak"), "rb") as f:
+        assert f.read() == b"pak"
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+
+import pytest
+
+import OSB_installer as O
+
+
+@pytest.fixture
+def polling(monkeypatch):
+    monkeypatch.setattr(O, "WATCHER_BACKENDS", [O.PollingWatcher])
+
+
+def write_later(path, files, delay=0.3, gap=0.1):
+    def run():
+        time.sleep(delay)
+        os.makedirs(path, exist_ok=True)
+        for name in files:
+            time.sleep(gap)
+            with open(os.path.join(path, name), "wb") as f:
+                f.write(b"x" * 100)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_polling_watcher_only_lists_direct_entries(tmp_path):
+    deep = tmp_path / "other" / "deep"
+    deep.mkdir(parents=True)
+    (deep / "file.txt").write_text("x")
+
+    watcher = O.PollingWatcher(str(tmp_path))
+    assert {name for _, name, _, _ in watcher.snapshot()} == {"other"}
+    (deep / "new.txt").write_text("y")
+    assert not watcher.wait(0.3)
+    watcher.add(str(tmp_path / "other"))
+    (deep / "newer.txt").write_text("z")
+    assert watcher.wait(1.0)
+
+
+def test_polling_watcher_skips_unreadable_entries(tmp_path, monkeypatch):
+    (tmp_path / "WindowsApps").mkdir()
+    (tmp_path / "ok.txt").write_text("x")
+    real_stat = os.stat
+
+    def stat(path, *args, **kwargs):
+        if "WindowsApps" in str(path):
+            raise PermissionError(13, "Access is denied", str(path))
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", stat)
+    watcher = O.PollingWatcher(str(tmp_path))
+    watcher.add(str(tmp_path))
+    assert {name for _, name, _, _ in watcher.snapshot()} == {"ok.txt"}
+
+
+@pytest.mark.parametrize("backend", ["inotify", "polling"])
+def test_wait_for_output_never_walks_siblings(tmp_path, monkeypatch, backend):
+    if backend == "polling":
+        monkeypatch.setattr(O, "WATCHER_BACKENDS", [O.PollingWatcher])
+    elif not O.InotifyWatcher.available():
+        pytest.skip("inotify is Linux-only")
+    sibling = tmp_path / "Huge App"
+    for i in range(20):
+        (sibling / str(i)).mkdir(parents=True)
+        (sibling / str(i) / "data.bin").write_bytes(b"x")
+
+    walked = []
+    real_walk = os.walk
+
+    def walk(top, *args, **kwargs):
+        walked.append(os.fspath(top))
+        return real_walk(top, *args, **kwargs)
+
+    monkeypatch.setattr(os, "walk", walk)
+    out = tmp_path / "OpenStarbound"
+    writer = write_later(str(out), ["a.pak", "b.pak", "c.pak"])
+    O.wait_for_output(str(out), timeout=30, quiet=0.5)
+    writer.join()
+    assert sorted(os.listdir(out)) == ["a.pak", "b.pak", "c.pak"]
+    assert not any(str(sibling) in top for top in walked)
+
+
+def test_wait_for_output_times_out(tmp_path, polling):
+    with pytest.raises(TimeoutError):
+        O.wait_for_output(str(tmp_path / "missing"), timeout=0.5)
@@ -0,0 +1,126 @@
+import io
+import os
+import json
+import functools
+import urllib.request
+
+import pytest
+
+import OSB_installer as O
+
+
+def write_provider(path, collections=None, items=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"collections": collections or {}, "items": items or {}}, f)
+    return O.JsonFileProvider(path)
+
+
+def test_nested_collections_expand_in_order(tmp_path):
+    provider = write_provider(str(tmp_path / "w.json"), collections={
+        "100": ["1", "101", "2"],
+        "101": ["3", "1"],
+    })
+    assert O.resolve_workshop_items(["100", "4"], provider) == ["4", "1", "2", "3"]
+
+
+def test_cyclic_collections_terminate(tmp_path):
+    provider = write_provider(str(tmp_path / "w.json"), collections={
+        "100": ["101", "1"],
+        "101": ["100", "2", "101"],
+    })
+    assert O.resolve_workshop_items(["100"], provider) == ["1", "2"]
+
+
+def test_duplicate_ids_are_dropped(tmp_path):
+    provider = write_provider(str(tmp_path / "w.json"), collections={"100": ["1", "2"]})
+    assert O.resolve_workshop_items(["2", 2, "100", "1", "2"], provider) == ["2", "1"]
+
+
+def test_outdated_lists_new_updated_and_missing_items(tmp_path):
+    content = str(tmp_path / "content")
+    for item in ("1", "2", "4"):
+        os.makedirs(os.path.join(content, item))
+    index = O.WorkshopIndex(str(tmp_path / "index.json"))
+    index.record({i: {"time_updated": 10, "file_size": 1} for i in ("1", "2", "3", "4")},
+                 content)
+
+    index = O.WorkshopIndex(str(tmp_path / "index.json"))
+    details = {
+        "1": {"time_updated": 10, "file_size": 1},    # unchanged
+        "2": {"time_updated": 11, "file_size": 1},    # updated upstream
+        "3": {"time_updated": 10, "file_size": 1},    # folder gone
+        "4": {"time_updated": None, "file_size": None},  # no metadata
+        "5": {"time_updated": 10, "file_size": 1},    # new
+    }
+    assert index.outdated(details) == ["2", "3", "4", "5"]
+
+
+class Workshop:
+    """
+    Runs the real starbound step against an existing game install, with
+    metadata from a JsonFileProvider and SteamCMD replaced by a recorder.
+    """
+
+    def __init__(self, root, monkeypatch, count=200):
+        self.root   = root
+        self.sb_dir = os.path.join(root, "Starbound")
+        self.json   = os.path.join(root, "workshop.json")
+        self.runs   = []
+        os.makedirs(self.sb_dir)
+        with open(os.path.join(self.sb_dir, "starbound.exe"), "wb") as f:
+            f.write(b"MZ")
+        ids = [str(1000 + i) for i in range(count)]
+        # Half the items sit in a nested collection that points back up
+        self.collections = {"900": ids[:count // 2] + ["901"], "901": ids[count // 2:] + ["900"]}
+        self.items = {i: {"time_updated": 1, "file_size": 10} for i in ids}
+        self.save()
+        monkeypatch.chdir(root)
+        monkeypatch.setenv("OSB_WORKSHOP_JSON", self.json)
+        monkeypatch.setattr(O, "WORKSHOP_MOD_IDS", ["900"])
+        monkeypatch.setattr(O, "WorkshopIndex",
+                            functools.partial(O.WorkshopIndex, os.path.join(root, "index.json")))
+        monkeypatch.setattr(O, "run_steamcmd_batch", self.steamcmd)
+
+    def save(self):
+        write_provider(self.json, self.collections, self.items)
+
+    def steamcmd(self, exe, install_dir, items, **kwargs):
+        self.runs.append(list(items))
+        for item in items:
+            os.makedirs(os.path.join(O.workshop_content_dir(install_dir), item), exist_ok=True)
+
+    def run(self):
+        engine = O.InstallEngine(steam_dir=self.sb_dir, osb_dirs=[os.path.join(self.root, "osb")],
+                                 steam_client=False, log=lambda txt: None)
+        engine._step_starbound()
+        return engine
+
+
+def test_unchanged_items_skip_steamcmd(tmp_path, monkeypatch):
+    workshop = Workshop(str(tmp_path), monkeypatch)
+    workshop.run()
+    assert len(workshop.runs) == 1
+    assert sorted(workshop.runs[0]) == sorted(workshop.items)
+
+    workshop.run()
+    assert len(workshop.runs) == 1  # all 200 unchanged, SteamCMD never started
+
+    workshop.items["1150"]["time_updated"] = 2
+    workshop.save()
+    workshop.run()
+    assert workshop.runs[1:] == [["1150"]]
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"response": None},
+    {"response": {"collectiondetails": [{"result": 1, "children": [{}]}]}},
+])
+def test_unexpected_web_api_reply_falls_back_to_configured_ids(tmp_path, monkeypatch, payload):
+    monkeypatch.setattr(urllib.request, "urlopen",
+                        lambda *args, **kwargs: io.BytesIO(json.dumps(payload).encode()))
+    logs = []
+    engine = O.InstallEngine(steam_dir=str(tmp_path), osb_dirs=[str(tmp_path / "osb")],
+                             steam_client=False, log=logs.append)
+    assert engine.mod_details() is None
+    assert any(line.startswith("⚠ Could not fetch workshop metadata") for line in logs)